@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ChatConfig(AppConfig):
     name = "apps.chat"
+
+    def ready(self):
+        # Importamos los signals para que se registren
+        import apps.chat.signals  # noqa: F401
@@ -1,12 +1,158 @@
 import json
 from typing import Any
+from urllib.parse import parse_qs
+from uuid import UUID
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import IntegrityError
 
+from apps.chat.services import (
+    OVERFLOW_CLOSE_CODE,
+    MessageWriterClosed,
+    OutboundQueue,
+    broadcast_chat_message,
+    broadcast_read_receipt,
+    get_message_writer,
+    get_presence,
+    insert_message,
+    mark_read,
+    match_group_name,
+    messages_after,
+    outbound_config,
+    profile_group_name,
+    resolve_sync_point,
+    start_stats_logger,
+)
 
-class ChatConsumer(AsyncWebsocketConsumer):
+# Máximo de conversaciones por frame de (des)suscripción
+MAX_SUBSCRIPTIONS_PER_FRAME = 200
+# Mensajes por query al reenviar lo perdido durante una reconexión
+SYNC_CHUNK_SIZE = 100
+
+
+@database_sync_to_async
+def _insert_message(match_id, sender_id, text):
+    # Sin lookups: match y remitente ya se validaron al suscribirse.
+    # Si el Match se borró mientras tanto, la FK rechaza el INSERT.
+    try:
+        return insert_message(match_id, sender_id, text)
+    except IntegrityError:
+        return None
+
+
+async def persist_message(match_id, sender_id, text):
+    """
+    Guarda un mensaje (un único INSERT) y devuelve la fila, o None si falla.
+    Con el MessageWriter activo, se agrupa con los de otras conexiones.
+    """
+    writer = get_message_writer()
+    if writer is None:
+        return await _insert_message(match_id, sender_id, text)
+    try:
+        return await writer.submit(match_id, sender_id, text)
+    except IntegrityError:
+        return None
+    except MessageWriterClosed:
+        # Apagando: se guarda igualmente, en su propia transacción
+        return await _insert_message(match_id, sender_id, text)
+
+
+async def mark_read_and_notify(
+    channel_layer, *, match_id, reader_id, other_profile_id, up_to
+) -> bool:
+    """
+    Marca como leído hasta `up_to` (un UPDATE) y, si cambió algo, emite
+    un único receipt. Devuelve False si `up_to` no es un ID válido.
+    """
+    try:
+        up_to = UUID(str(up_to))
+    except ValueError:
+        return False
+
+    marked, _ = await database_sync_to_async(mark_read)(reader_id, match_id, up_to)
+    if marked:
+        await broadcast_read_receipt(
+            channel_layer,
+            match_id=match_id,
+            reader_id=reader_id,
+            recipient_id=other_profile_id,
+            up_to=up_to,
+        )
+    return True
+
+
+def publish_typing(throttle, *, match_id, profile_id, other_profile_id, active) -> None:
+    """
+    "Escribiendo" hacia el otro participante, esté en el socket de la sala
+    o en el multiplexado. Nunca toca Postgres.
+    """
+    get_presence().typing(
+        throttle,
+        profile_id,
+        match_id,
+        [match_group_name(match_id), profile_group_name(other_profile_id)],
+        active=bool(active),
+    )
+
+
+def presence_frame(event: dict[str, Any], own_profile_id) -> dict | None:
+    """Frame 'presence' para el cliente, sin las novedades del propio perfil."""
+    own_profile_id = str(own_profile_id)
+    updates = [u for u in event["updates"] if u["profile_id"] != own_profile_id]
+    if not updates:
+        return None
+    return {"type": "presence", "updates": updates}
+
+
+def get_profile_id(user) -> UUID | None:
+    """ID del perfil del usuario (None si aún no lo ha creado)."""
+    try:
+        return user.profile.id
+    except ObjectDoesNotExist:
+        return None
+
+
+def parse_message_text(payload: dict[str, Any]) -> str | None:
+    """Texto del mensaje ya limpio, o None si no es válido."""
+    message_text = payload.get("message")
+    if not message_text or not isinstance(message_text, str):
+        return None
+    return message_text.strip() or None
+
+
+class OutboundQueueMixin:
+    """
+    Los eventos del grupo salen por una OutboundQueue acotada: un cliente
+    lento no bloquea al consumer ni hace crecer los buffers sin límite.
+    Las respuestas directas (errores, resincronización en connect) siguen
+    usando send().
+    """
+
+    def open_outbound(self):
+        config = outbound_config()
+        self.outbound = OutboundQueue(
+            self.send_text,
+            self.close_overflowed,
+            max_queue=config["MAX_QUEUE"],
+            max_batch=config["MAX_BATCH"],
+        )
+        start_stats_logger(config["STATS_INTERVAL"])
+
+    async def close_outbound(self):
+        if hasattr(self, "outbound"):
+            await self.outbound.close()
+
+    async def send_text(self, text: str):
+        await self.send(text_data=text)
+
+    async def close_overflowed(self, resume_from: str | None):
+        # El motivo del cierre lleva el id para reanudar (?since= / ?after=)
+        await self.close(code=OVERFLOW_CLOSE_CODE, reason=resume_from)
+
+
+class ChatConsumer(OutboundQueueMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope.get("user")
 
@@ -22,26 +168,64 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close(code=4000)
             return
 
-        self.room_group_name = f"chat_{self.match_id}"
+        self.room_group_name = match_group_name(self.match_id)
 
         # 2. Autenticación: ¿El usuario que se conecta pertenece a este Match?
-        # (Esto es CRÍTICO para la privacidad, lo implementaremos en el paso de validación.
-        # Por ahora asumimos que sí para probar la conexión básica).
-
-        is_member = await self.check_match_permissions(self.match_id, self.user)
-        if not is_member:
+        # Se resuelve UNA vez por conexión y se guarda: los mensajes posteriores
+        # no vuelven a consultar ni el Match ni el perfil.
+        participant = await self.get_participant(self.match_id, self.user)
+        if participant is None:
             await self.close(code=4003)  # Forbidden
             return
 
+        self.match_id = participant.match_id
+        self.profile = self.user.profile
+        self.profile_id = participant.profile_id
+        self.other_profile_id = participant.other_profile_id
+
         # 3. Unirse al grupo de Redis (La Sala)
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
 
         # 4. Aceptar la conexión WebSocket
         await self.accept()
+        self.open_outbound()
+
+        # 5. Presencia: "online" para la sala y estado actual del otro
+        # (Redis con TTL, nunca Postgres)
+        presence = get_presence()
+        self.typing_throttle = presence.new_throttle()
+        await presence.connected(self.profile_id, [self.room_group_name])
+        online = await presence.online([self.other_profile_id])
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "presence",
+                    "updates": [
+                        {
+                            "profile_id": str(self.other_profile_id),
+                            "online": bool(online),
+                        }
+                    ],
+                }
+            )
+        )
+
+        # 6. Reconexión: ?since=<id de mensaje o fecha ISO>.
+        # Mandamos lo que se perdió antes de atender el tráfico en vivo
+        # (los eventos del grupo esperan a que termine connect()).
+        since = self.get_query_param("since")
+        if since:
+            await self.send_missed_messages(since)
 
     async def disconnect(self, code):
-        # Salir del grupo
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await self.close_outbound()
+        # Salir del grupo (si llegamos a entrar)
+        if hasattr(self, "profile_id"):
+            await self.channel_layer.group_discard(
+                self.room_group_name, self.channel_name
+            )
+        if hasattr(self, "typing_throttle"):
+            await get_presence().disconnected(self.profile_id, [self.room_group_name])
 
     # Recibir mensaje del WebSocket (del Frontend)
     async def receive(self, text_data=None, bytes_data=None):
@@ -51,56 +235,133 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # Parseo seguro del JSON
         try:
             text_data_json = json.loads(text_data)
-            message_text = text_data_json["message"]
         except json.JSONDecodeError:
             await self.send_error("Invalid JSON format.")
             return
+        if not isinstance(text_data_json, dict):
+            await self.send_error("Invalid JSON format.")
+            return
 
-        if not message_text or not isinstance(message_text, str):
-            await self.send_error("Message cannot be empty")
+        frame_type = text_data_json.get("type")
+
+        # Confirmación de lectura: {"type": "mark_read", "up_to": "<id>"}
+        if frame_type == "mark_read":
+            marked = await mark_read_and_notify(
+                self.channel_layer,
+                match_id=self.match_id,
+                reader_id=self.profile_id,
+                other_profile_id=self.other_profile_id,
+                up_to=text_data_json.get("up_to"),
+            )
+            if not marked:
+                await self.send_error("Invalid up_to.")
+            return
+
+        # Indicador de escritura: {"type": "typing", "active": true|false}
+        if frame_type == "typing":
+            publish_typing(
+                self.typing_throttle,
+                match_id=self.match_id,
+                profile_id=self.profile_id,
+                other_profile_id=self.other_profile_id,
+                active=text_data_json.get("active", True),
+            )
             return
 
-        # Limpiar espacios (opcional pero recomendado)
-        message_text = message_text.strip()
-        if not message_text:
+        # Mensaje: {"message": "..."} (con o sin "type": "message")
+        if frame_type not in (None, "message"):
+            await self.send_error("Unknown frame type.")
             return
 
-        user_id = self.scope.get("user").profile.id
-        # ID del usuario logueado (gracias al AuthMiddleware)
+        message_text = parse_message_text(text_data_json)
+        if message_text is None:
+            await self.send_error("Message cannot be empty")
+            return
 
-        # 1. Guardar mensaje en Base de Datos (Función auxiliar)
+        # 1. Guardar mensaje en Base de Datos (un único INSERT)
         # Necesitamos 'await' porque guardar en BD es una operación bloqueante
-        saved_message = await self.save_message(self.match_id, user_id, message_text)
+        saved_message = await persist_message(
+            self.match_id, self.profile_id, message_text
+        )
 
         if not saved_message:
             await self.send_error("Failed to save message.")
             return
 
         # 2. Enviar mensaje al grupo (Redis broadcast)
-        # Esto hace que le llegue TAMBIÉN a la otra persona
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat_message",  # Llama al método chat_message de abajo
-                "message": message_text,
-                "sender_id": str(user_id),
-                "timestamp": str(saved_message.created_at),
-            },
+        # Esto hace que le llegue TAMBIÉN a la otra persona (en cualquier socket)
+        await broadcast_chat_message(
+            self.channel_layer,
+            match_id=self.match_id,
+            message_id=saved_message.id,
+            sender_id=self.profile_id,
+            recipient_id=self.other_profile_id,
+            text=message_text,
+            created_at=saved_message.created_at,
         )
 
     # Este método se ejecuta cuando Redis nos avisa de un nuevo mensaje en el grupo
     async def chat_message(self, event: dict[str, Any]):
-        # Manejador del broadcast para enviar al socket
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": event["message"],
-                    "sender_id": event["sender_id"],
-                    "timestamp": event.get("timestamp"),
-                }
-            )
+        # Manejador del broadcast: se encola, la cola lo envía al socket
+        self.outbound.push(
+            {
+                # El id permite al cliente descartar duplicados tras un 'since'
+                "id": event.get("message_id"),
+                "message": event["message"],
+                "sender_id": event["sender_id"],
+                "timestamp": event.get("timestamp"),
+            }
         )
 
+    async def chat_receipt(self, event: dict[str, Any]):
+        # El otro (o yo desde otro dispositivo) ha leído hasta 'up_to'
+        self.outbound.push(
+            {
+                "type": "receipt",
+                "reader_id": event["reader_id"],
+                "up_to": event["up_to"],
+            }
+        )
+
+    async def presence_batch(self, event: dict[str, Any]):
+        # Lote coalescido de online/escribiendo de la sala
+        frame = presence_frame(event, self.profile_id)
+        if frame is not None:
+            # Lo primero que se descarta si el cliente va lento
+            self.outbound.push(frame, droppable=True)
+
+    async def send_missed_messages(self, since: str):
+        """
+        Reenvía, en tramos de SYNC_CHUNK_SIZE, los mensajes posteriores a
+        `since` con el mismo formato que los mensajes en vivo.
+        """
+        position = await self.get_sync_point(since)
+        if position is None:
+            return
+
+        created_at, message_id = position
+        while True:
+            chunk = await self.get_messages_after(created_at, message_id)
+            for message in chunk:
+                await self.send(
+                    text_data=json.dumps(
+                        {
+                            "id": str(message["id"]),
+                            "message": message["text"],
+                            "sender_id": str(message["sender_id"]),
+                            "timestamp": str(message["created_at"]),
+                        }
+                    )
+                )
+            if len(chunk) < SYNC_CHUNK_SIZE:
+                return
+            created_at, message_id = chunk[-1]["created_at"], chunk[-1]["id"]
+
+    def get_query_param(self, name: str) -> str | None:
+        query_string = self.scope.get("query_string", b"").decode("utf-8")
+        values = parse_qs(query_string).get(name)
+        return values[0] if values else None
+
     async def send_error(self, error_message: str):
         """Helper para enviar errores estandarizados al frontend"""
         await self.send(text_data=json.dumps({"error": error_message}))
@@ -109,28 +370,290 @@ class ChatConsumer(AsyncWebsocketConsumer):
     # Como Django ORM es síncrono, necesitamos envolverlo en database_sync_to_async
 
     @database_sync_to_async
-    def save_message(self, match_id, user_id, text):
-        from apps.chat.models import Message
-        from apps.matches.models import Match
+    def get_sync_point(self, since: str):
+        return resolve_sync_point(self.match_id, since)
 
-        try:
-            match = Match.objects.get(id=match_id)
-            profile = self.user.profile
+    @database_sync_to_async
+    def get_messages_after(self, created_at, message_id):
+        return messages_after(self.match_id, created_at, message_id, SYNC_CHUNK_SIZE)
 
-            return Message.objects.create(match=match, sender=profile, text=text)
+    @database_sync_to_async
+    def get_participant(self, match_id, user):
+        from apps.matches.models import MatchParticipant
 
-        except ObjectDoesNotExist:
+        # El middleware ya trae el perfil (select_related): la pertenencia
+        # es un único lookup por la clave primaria (profile, match)
+        profile_id = get_profile_id(user)
+        if profile_id is None:
+            return None
+        try:
+            return MatchParticipant.objects.get(
+                match_id=match_id, profile_id=profile_id
+            )
+        except (ObjectDoesNotExist, ValidationError):
             return None
 
-    @database_sync_to_async
-    def check_match_permissions(self, match_id, user) -> bool:
-        from apps.matches.models import Match
 
-        # Verificamos existencia Y pertenencia en una sola query
+class UserChatConsumer(OutboundQueueMixin, AsyncWebsocketConsumer):
+    """
+    Un único socket por usuario para todas sus conversaciones (ws/chat/).
+
+    La conexión se une solo al grupo personal del perfil; los mensajes de
+    cualquier Match llegan ahí etiquetados con su match_id. Las
+    suscripciones son locales a la conexión (sin un grupo de Redis por
+    Match) y se validan por lotes con una sola query.
+
+    Frames del cliente:
+        {"type": "subscribe", "match_ids": [...]}
+        {"type": "unsubscribe", "match_ids": [...]}
+        {"type": "message", "match_id": "...", "message": "..."}
+        {"type": "mark_read", "match_id": "...", "up_to": "<id de mensaje>"}
+        {"type": "typing", "match_id": "...", "active": true|false}
+
+    La presencia del otro participante llega en la respuesta a "subscribe"
+    y después en frames "presence" (coalescidos, ver services.presence).
+    Si el cliente no da abasto, se cierra con OVERFLOW_CLOSE_CODE y sin
+    motivo: un único id solo serviría para una de las conversaciones. El
+    cliente guarda el último id recibido de cada una y la recupera por
+    REST con ?after=<ese id>.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get("user")
+
+        if not self.user or not self.user.is_authenticated:
+            await self.close(code=4003)
+            return
+
+        # Perfil precargado por JWTAuthMiddleware: sin query
+        self.profile_id = get_profile_id(self.user)
+        if self.profile_id is None:
+            await self.close(code=4003)
+            return
+
+        # match_id -> perfil del otro participante
+        self.subscriptions: dict[str, UUID] = {}
+        self.group_name = profile_group_name(self.profile_id)
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        self.open_outbound()
+
+        # Online sin anunciarlo aún: se anuncia al suscribirse a cada conversación
+        presence = get_presence()
+        self.typing_throttle = presence.new_throttle()
+        await presence.connected(self.profile_id, [])
+
+    async def disconnect(self, code):
+        await self.close_outbound()
+        if getattr(self, "group_name", None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if hasattr(self, "typing_throttle"):
+            await get_presence().disconnected(
+                self.profile_id, self.presence_groups(self.subscriptions)
+            )
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            return
+
         try:
-            match = Match.objects.get(id=match_id)
-            # Validar si el usuario es parte del match
-            return match.user_a == user.profile or match.user_b == user.profile
+            payload = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send_error("Invalid JSON format.")
+            return
+        if not isinstance(payload, dict):
+            await self.send_error("Invalid JSON format.")
+            return
+
+        frame_type = payload.get("type")
+        if frame_type == "subscribe":
+            await self.subscribe(payload.get("match_ids"))
+        elif frame_type == "unsubscribe":
+            await self.unsubscribe(payload.get("match_ids"))
+        elif frame_type == "message":
+            await self.send_chat_message(payload)
+        elif frame_type == "mark_read":
+            await self.mark_read(payload)
+        elif frame_type == "typing":
+            await self.typing(payload)
+        else:
+            await self.send_error("Unknown frame type.")
+
+    async def subscribe(self, match_ids):
+        match_ids = self.clean_match_ids(match_ids)
+        if match_ids is None:
+            await self.send_error("match_ids must be a list.")
+            return
+
+        allowed = await self.get_memberships(match_ids)
+        self.subscriptions.update(allowed)
+
+        # Presencia: anunciamos que estamos y leemos quién está (un MGET)
+        presence = get_presence()
+        presence.announce(self.profile_id, self.presence_groups(allowed), online=True)
+        online = await presence.online(set(allowed.values()))
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "subscribed",
+                    "match_ids": list(allowed),
+                    # Los que no existen o no son suyos, sin distinguir
+                    "rejected": [m for m in match_ids if m not in allowed],
+                    "online": sorted(online),
+                }
+            )
+        )
+
+    async def unsubscribe(self, match_ids):
+        match_ids = self.clean_match_ids(match_ids)
+        if match_ids is None:
+            await self.send_error("match_ids must be a list.")
+            return
+
+        for match_id in match_ids:
+            self.subscriptions.pop(match_id, None)
+        await self.send(
+            text_data=json.dumps({"type": "unsubscribed", "match_ids": match_ids})
+        )
+
+    async def send_chat_message(self, payload: dict[str, Any]):
+        match_id = str(payload.get("match_id", "")).lower()
+        other_profile_id = self.subscriptions.get(match_id)
+        if other_profile_id is None:
+            await self.send_error("Not subscribed to this match.")
+            return
+
+        message_text = parse_message_text(payload)
+        if message_text is None:
+            await self.send_error("Message cannot be empty")
+            return
+
+        saved_message = await persist_message(match_id, self.profile_id, message_text)
+        if not saved_message:
+            await self.send_error("Failed to save message.")
+            return
+
+        await broadcast_chat_message(
+            self.channel_layer,
+            match_id=saved_message.match_id,
+            message_id=saved_message.id,
+            sender_id=self.profile_id,
+            recipient_id=other_profile_id,
+            text=message_text,
+            created_at=saved_message.created_at,
+        )
+
+    async def mark_read(self, payload: dict[str, Any]):
+        match_id = str(payload.get("match_id", "")).lower()
+        other_profile_id = self.subscriptions.get(match_id)
+        if other_profile_id is None:
+            await self.send_error("Not subscribed to this match.")
+            return
+
+        marked = await mark_read_and_notify(
+            self.channel_layer,
+            match_id=match_id,
+            reader_id=self.profile_id,
+            other_profile_id=other_profile_id,
+            up_to=payload.get("up_to"),
+        )
+        if not marked:
+            await self.send_error("Invalid up_to.")
+
+    async def typing(self, payload: dict[str, Any]):
+        match_id = str(payload.get("match_id", "")).lower()
+        other_profile_id = self.subscriptions.get(match_id)
+        if other_profile_id is None:
+            await self.send_error("Not subscribed to this match.")
+            return
+
+        publish_typing(
+            self.typing_throttle,
+            match_id=match_id,
+            profile_id=self.profile_id,
+            other_profile_id=other_profile_id,
+            active=payload.get("active", True),
+        )
+
+    async def presence_batch(self, event: dict[str, Any]):
+        # "Escribiendo" solo de conversaciones suscritas; "online" siempre
+        event = {
+            "updates": [
+                update
+                for update in event["updates"]
+                if "match_id" not in update or update["match_id"] in self.subscriptions
+            ]
+        }
+        frame = presence_frame(event, self.profile_id)
+        if frame is not None:
+            # Lo primero que se descarta si el cliente va lento
+            self.outbound.push(frame, droppable=True)
+
+    async def chat_receipt(self, event: dict[str, Any]):
+        if event["match_id"] not in self.subscriptions:
+            return
+        self.outbound.push(
+            {
+                "type": "receipt",
+                "match_id": event["match_id"],
+                "reader_id": event["reader_id"],
+                "up_to": event["up_to"],
+            }
+        )
+
+    async def chat_message(self, event: dict[str, Any]):
+        # Solo reenviamos las conversaciones a las que está suscrito
+        if event["match_id"] not in self.subscriptions:
+            return
+        self.outbound.push(
+            {
+                "type": "message",
+                "id": event.get("message_id"),
+                "match_id": event["match_id"],
+                "message": event["message"],
+                "sender_id": event["sender_id"],
+                "timestamp": event.get("timestamp"),
+            }
+        )
+
+    async def send_error(self, error_message: str):
+        await self.send(text_data=json.dumps({"error": error_message}))
+
+    async def close_overflowed(self, resume_from: str | None):
+        # resume_from es de la última conversación entregada, no de todas
+        await self.close(code=OVERFLOW_CLOSE_CODE)
+
+    @staticmethod
+    def presence_groups(subscriptions: dict[str, UUID]) -> list[str]:
+        """Salas donde anunciar la presencia: cada Match y el grupo del otro."""
+        groups = []
+        for match_id, other_profile_id in subscriptions.items():
+            groups.append(match_group_name(match_id))
+            groups.append(profile_group_name(other_profile_id))
+        return groups
+
+    @staticmethod
+    def clean_match_ids(match_ids) -> list[str] | None:
+        """Normaliza la lista de IDs (UUID en minúsculas), o None si no es válida."""
+        if not isinstance(match_ids, list):
+            return None
+        cleaned = []
+        for match_id in match_ids[:MAX_SUBSCRIPTIONS_PER_FRAME]:
+            try:
+                cleaned.append(str(UUID(str(match_id))))
+            except ValueError:
+                continue
+        return cleaned
+
+    # --- Métodos Auxiliares para hablar con la Base de Datos ---
+
+    @database_sync_to_async
+    def get_memberships(self, match_ids: list[str]) -> dict[str, UUID]:
+        from apps.matches.models import MatchParticipant
 
-        except ObjectDoesNotExist:
-            return False
+        # Una sola query para todo el lote, por la clave primaria (profile, match)
+        rows = MatchParticipant.objects.filter(
+            profile_id=self.profile_id, match_id__in=match_ids
+        ).values_list("match_id", "other_profile_id")
+        return {str(match_id): other_id for match_id, other_id in rows}
@@ -0,0 +1,46 @@
+import asyncio
+import sys
+
+from .services.message_writer import close_message_writer
+
+
+class LifespanApp:
+    """
+    Manejador del protocolo ASGI "lifespan" (uvicorn, hypercorn...).
+    Al apagar el servidor vacía el MessageWriter para no perder mensajes
+    que estén esperando en el buffer.
+    """
+
+    async def __call__(self, scope, receive, send):
+        while True:
+            event = await receive()
+            if event["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif event["type"] == "lifespan.shutdown":
+                await close_message_writer()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def install_daphne_shutdown_hook() -> bool:
+    """
+    Daphne nunca envía eventos lifespan: el vaciado se engancha al apagado
+    del reactor de Twisted (SIGTERM/SIGINT). El reactor espera al Deferred,
+    así el buffer se escribe antes de que el proceso termine.
+
+    Devuelve False si no hay reactor (otro servidor ASGI: usa LifespanApp).
+    """
+    # Solo si Daphne ya instaló el reactor: importarlo aquí instalaría otro
+    reactor = sys.modules.get("twisted.internet.reactor")
+    if reactor is None:
+        return False
+
+    from twisted.internet.defer import Deferred
+
+    def flush_message_writer():
+        # Daphne fija el bucle del reactor como el bucle global de asyncio
+        loop = asyncio.get_event_loop()
+        return Deferred.fromFuture(loop.create_task(close_message_writer()))
+
+    reactor.addSystemEventTrigger("before", "shutdown", flush_message_writer)
+    return True
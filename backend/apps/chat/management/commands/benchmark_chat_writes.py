@@ -0,0 +1,86 @@
+import asyncio
+import time
+import uuid
+from datetime import date
+
+from channels.db import database_sync_to_async
+from django.core.management.base import BaseCommand
+
+from apps.chat.services import MessageWriter, insert_message
+from apps.chat.services.message_writer import DEFAULTS
+from apps.matches.models import Match
+from apps.users.models import CustomUser, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide mensajes/segundo guardando cada mensaje en su propia "
+        "transacción y con el MessageWriter (group commit)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=100)
+        parser.add_argument("--messages", type=int, default=20, help="Por conexión")
+
+    def handle(self, *args, **options):
+        pairs = self.create_conversations(options["connections"])
+        try:
+            for label, writer in (
+                ("Sin writer", None),
+                ("Con writer", MessageWriter(**self.writer_options())),
+            ):
+                rate = asyncio.run(self.measure(pairs, options["messages"], writer))
+                self.stdout.write(f"{label}: {rate:8.1f} mensajes/s")
+        finally:
+            # Borra usuarios -> perfiles -> matches -> mensajes (en cascada)
+            CustomUser.objects.filter(email__startswith="bench-chat-").delete()
+
+    @staticmethod
+    def writer_options() -> dict:
+        return {
+            "max_batch": DEFAULTS["MAX_BATCH"],
+            "max_delay_ms": DEFAULTS["MAX_DELAY_MS"],
+            "max_pending": DEFAULTS["MAX_PENDING"],
+        }
+
+    @staticmethod
+    def create_conversations(count: int) -> list[tuple[uuid.UUID, uuid.UUID]]:
+        """Una conversación por conexión: (match_id, remitente)."""
+        run = uuid.uuid4().hex[:8]
+        users = CustomUser.objects.bulk_create(
+            CustomUser(email=f"bench-chat-{run}-{i}@example.com")
+            for i in range(2 * count)
+        )
+        profiles = Profile.objects.bulk_create(
+            Profile(
+                custom_user=user,
+                first_name="bench",
+                birth_date=date(1995, 6, 15),
+                gender=Profile.Gender.OTHER,
+            )
+            for user in users
+        )
+        pairs = []
+        for sender, other in zip(profiles[::2], profiles[1::2], strict=True):
+            # create() (no bulk_create): el signal da de alta los participantes
+            match = Match.objects.create(user_a=sender, user_b=other)
+            pairs.append((match.id, sender.id))
+        return pairs
+
+    @staticmethod
+    async def measure(pairs, messages: int, writer: MessageWriter | None) -> float:
+        insert = database_sync_to_async(insert_message)
+
+        async def connection(match_id, sender_id):
+            # Cada conexión manda sus mensajes uno detrás de otro, como un chat
+            for i in range(messages):
+                if writer is None:
+                    await insert(match_id, sender_id, f"mensaje {i}")
+                else:
+                    await writer.submit(match_id, sender_id, f"mensaje {i}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(*pair) for pair in pairs))
+        if writer is not None:
+            await writer.close()
+        return len(pairs) * messages / (time.perf_counter() - started)
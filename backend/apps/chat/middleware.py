@@ -5,10 +5,16 @@ Usage:
     Frontend connects with: ws://host/ws/chat/123/?token=<jwt_access_token>
 """
 
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
 from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
@@ -16,21 +22,141 @@ from rest_framework_simplejwt.tokens import AccessToken
 
 from apps.users.models import CustomUser
 
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Usuarios autenticados en caché como máximo (LRU)
+    "MAX_SIZE": 10_000,
+    # Cada cuántos segundos se registra stats() (0 = nunca)
+    "STATS_INTERVAL": 60,
+}
+
+
+def token_cache_config() -> dict[str, int]:
+    return {**DEFAULTS, **getattr(settings, "CHAT_TOKEN_CACHE", {})}
+
+
+class TokenUserCache:
+    """
+    Caché LRU acotada de usuarios autenticados por WebSocket.
+
+    La clave es (jti, user_id) del token ya validado y cada entrada caduca
+    en el `exp` del propio token. Tras un deploy, la avalancha de
+    reconexiones con los mismos tokens no vuelve a tocar Postgres.
+
+    Es por proceso: `invalidate_user` solo limpia la caché del proceso que
+    desactiva al usuario; en el resto la entrada dura como mucho hasta el
+    `exp` del token (ACCESS_TOKEN_LIFETIME).
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, str], tuple[float, CustomUser]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[str, str]) -> CustomUser | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: tuple[str, str], user: CustomUser, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id) -> None:
+        """Borra todas las entradas de un usuario (desactivado o eliminado)."""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, float]:
+        """Métrica de aciertos para monitorizar la caché."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+token_user_cache = TokenUserCache(token_cache_config()["MAX_SIZE"])
+_stats_task: asyncio.Task | None = None
+
+
+def start_stats_logger(interval: float) -> None:
+    """
+    Registra token_user_cache.stats() cada `interval` segundos mientras
+    la caché tenga entradas (logger de este módulo, INFO).
+    """
+    global _stats_task
+    if interval and (_stats_task is None or _stats_task.done()):
+        _stats_task = asyncio.create_task(
+            _log_stats(interval), name="chat-token-cache-stats"
+        )
+
+
+async def _log_stats(interval: float) -> None:
+    while token_user_cache:
+        await asyncio.sleep(interval)
+        logger.info("Caché de tokens del WebSocket: %s", token_user_cache.stats())
+
 
 @database_sync_to_async
-def get_user_from_token(token_str: str) -> CustomUser | AnonymousUser:
+def _load_user(user_id) -> CustomUser | None:
+    # El perfil viene en la misma query: los consumers lo usan nada más conectar
+    try:
+        return CustomUser.objects.select_related("profile").get(
+            id=user_id, is_active=True
+        )
+    except ObjectDoesNotExist:
+        return None
+
+
+async def get_user_from_token(token_str: str) -> CustomUser | AnonymousUser:
     """
     Valida el token JWT y devuelve el usuario asociado.
     Si el token es inválido o el usuario no existe, devuelve AnonymousUser.
     """
     try:
-        # Decodifica y valida el token
+        # Decodifica y valida el token (firma y caducidad, sin BD)
         access_token = AccessToken(token_str)  # type: ignore
-        user_id = access_token["user_id"]
-        return CustomUser.objects.get(id=user_id)
-    except (InvalidToken, TokenError, ObjectDoesNotExist, KeyError):
+        user_id = str(access_token["user_id"])
+        key = (str(access_token["jti"]), user_id)
+        expires_at = float(access_token["exp"])
+    except (InvalidToken, TokenError, KeyError):
         return AnonymousUser()
 
+    user = token_user_cache.get(key)
+    if user is None:
+        user = await _load_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        token_user_cache.set(key, user, expires_at)
+    return user
+
 
 class JWTAuthMiddleware(BaseMiddleware):
     """
@@ -49,6 +175,7 @@ class JWTAuthMiddleware(BaseMiddleware):
 
         if token:
             scope["user"] = await get_user_from_token(token)
+            start_stats_logger(token_cache_config()["STATS_INTERVAL"])
         else:
             scope["user"] = AnonymousUser()
 
@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:55
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_activity(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    MatchParticipant = apps.get_model("matches", "MatchParticipant")
+
+    last_message = (
+        Message.objects.filter(match_id=OuterRef("match_id"))
+        .order_by("-created_at")
+        .values("created_at")[:1]
+    )
+    MatchParticipant.objects.update(
+        last_activity_at=Coalesce(Subquery(last_message), "created_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        ('matches', '0005_matchparticipant_last_activity_at'),
+        ('users', '0006_profile_matching_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['match', 'sender'], name='message_unread_idx'),
+        ),
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:03
+
+from django.db import migrations
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_count(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    MatchParticipant = apps.get_model("matches", "MatchParticipant")
+
+    # Hasta ahora nadie ponía is_read: todo el histórico figura como no leído.
+    # Quien ha contestado después ha leído lo anterior: se marca como leído
+    # (así mark_read tampoco lo descontará luego del contador).
+    replied_later = Message.objects.filter(
+        match_id=OuterRef("match_id"), created_at__gt=OuterRef("created_at")
+    ).exclude(sender_id=OuterRef("sender_id"))
+    Message.objects.filter(is_read=False).filter(Exists(replied_later)).update(
+        is_read=True
+    )
+
+    # Solo cuenta lo recibido después de la última respuesta del participante
+    unread = (
+        Message.objects.filter(match_id=OuterRef("match_id"), is_read=False)
+        .exclude(sender_id=OuterRef("profile_id"))
+        .order_by()
+        .values("match_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    MatchParticipant.objects.update(
+        unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_unread_idx'),
+        ('matches', '0006_matchparticipant_unread_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unread_count, migrations.RunPython.noop),
+    ]
@@ -28,6 +28,12 @@ class Message(models.Model):
             models.Index(
                 fields=["match", "created_at"]
             ),  # Index para optimizar consultas por sala y fecha
+            # Solo los no leídos: contar pendientes de una sala es barato
+            models.Index(
+                fields=["match", "sender"],
+                condition=models.Q(is_read=False),
+                name="message_unread_idx",
+            ),
         ]
 
     def __str__(self):
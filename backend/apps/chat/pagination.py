@@ -0,0 +1,107 @@
+from uuid import UUID
+
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.users.pagination import KeysetCursorPagination
+
+
+class InboxCursorPagination(KeysetCursorPagination):
+    """
+    Bandeja de entrada: las conversaciones con actividad más reciente primero.
+    Cursor (last_activity_at, match_id) sobre el índice (profile, -last_activity_at).
+    """
+
+    page_size = 20
+    max_page_size = 50
+    ordering = ("-last_activity_at", "-match_id")
+
+
+class MessageCursorPagination(KeysetCursorPagination):
+    """
+    Historial de un chat sobre el índice (match, created_at), desempate por id.
+
+    - Por defecto (o con ?before=<cursor>): los más recientes primero,
+      hacia atrás en el tiempo.
+    - Con ?after=<cursor>: solo los posteriores al cursor, del más antiguo
+      al más nuevo (lo que se perdió el cliente mientras estaba desconectado).
+      En vez del cursor vale el id del último mensaje recibido, el mismo
+      que ?since= del WebSocket y el motivo de cierre OVERFLOW_CLOSE_CODE.
+
+    'next' sigue en la misma dirección; 'newer' apunta siempre a lo
+    posterior al mensaje más nuevo de la página (con ?after= y ninguno
+    nuevo, al mismo cursor, para seguir preguntando).
+    """
+
+    before_query_param = "before"
+    after_query_param = "after"
+    page_size = 50
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.forward = self.after_query_param in request.query_params
+        self.cursor_query_param = (
+            self.after_query_param if self.forward else self.before_query_param
+        )
+        self.queryset = queryset
+        rows = super().paginate_queryset(queryset, request, view)
+
+        if rows:
+            newest = rows[-1] if self.forward else rows[0]
+            self.newer_cursor = self.encode_cursor(newest)
+        elif self.forward:
+            # Nada nuevo (lo normal al reconectar): se sigue desde el mismo cursor
+            self.newer_cursor = request.query_params[self.after_query_param] or None
+        else:
+            self.newer_cursor = None
+        return rows
+
+    def decode_cursor(self, request):
+        if self.forward:
+            try:
+                message_id = UUID(request.query_params[self.after_query_param])
+            except ValueError:
+                pass
+            else:
+                # La posición de ese mensaje dentro del chat pedido
+                position = (
+                    self.queryset.filter(id=message_id)
+                    .values_list("created_at", "id")
+                    .first()
+                )
+                if position is None:
+                    raise NotFound(self.invalid_cursor_message)
+                return list(position)
+        return super().decode_cursor(request)
+
+    def get_ordering(self, queryset, view=None):
+        if self.forward:
+            return ("created_at", "id")
+        return ("-created_at", "-id")
+
+    def get_newer_link(self) -> str | None:
+        if self.newer_cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.before_query_param
+        )
+        return replace_query_param(url, self.after_query_param, self.newer_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "newer": self.get_newer_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["newer"] = {
+            "type": "string",
+            "nullable": True,
+            "format": "uri",
+        }
+        return response_schema
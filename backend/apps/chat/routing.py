@@ -6,4 +6,7 @@ websocket_urlpatterns = [
     # Expresión regular para capturar el UUID del match
     # Ejemplo: ws/chat/123/
     re_path(r"ws/chat/(?P<match_id>[0-9a-f-]+)/$", consumers.ChatConsumer.as_asgi()),
+    # Un único socket por usuario para todas sus conversaciones
+    # Ejemplo: ws/chat/
+    re_path(r"ws/chat/$", consumers.UserChatConsumer.as_asgi()),
 ]
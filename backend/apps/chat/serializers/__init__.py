@@ -1,5 +1,8 @@
-from .message_serializer import MessageSerializer
+from .inbox_serializer import InboxSerializer
+from .message_serializer import MarkReadSerializer, MessageSerializer
 
 __all__ = [
     "MessageSerializer",
+    "InboxSerializer",
+    "MarkReadSerializer",
 ]
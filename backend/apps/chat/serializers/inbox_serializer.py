@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from apps.matches.models import MatchParticipant
+from apps.users.serializers import PublicProfileSerializer
+
+
+class InboxSerializer(serializers.ModelSerializer):
+    """
+    Una conversación de la bandeja de entrada.
+    'last_message' viene anotado por la vista; 'unread_count' es un contador
+    de MatchParticipant.
+    """
+
+    match_id = serializers.UUIDField(read_only=True)
+    other_user = PublicProfileSerializer(source="other_profile", read_only=True)
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MatchParticipant
+        fields = [
+            "match_id",
+            "other_user",
+            "last_message",
+            "unread_count",
+            "last_activity_at",
+        ]
+
+    def get_last_message(self, obj):
+        message = obj.last_message
+        if not message:
+            return None
+        return {
+            "id": message["id"],
+            "text": message["text"],
+            "is_me": message["sender_id"] == str(obj.profile_id),
+            "created_at": message["created_at"],
+        }
@@ -11,4 +11,11 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ["id", "text", "is_me", "created_at", "is_read"]
 
     def get_is_me(self, obj):
-        return obj.sender == self.context["request"].user.profile
+        return obj.sender_id == self.context["request"].user.profile_id
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """Entrada de mark_read: todo lo recibido hasta 'up_to' queda leído."""
+
+    match_id = serializers.UUIDField()
+    up_to = serializers.UUIDField()
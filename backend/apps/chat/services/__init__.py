@@ -0,0 +1,44 @@
+from .broadcast import (
+    broadcast_chat_message,
+    broadcast_read_receipt,
+    match_group_name,
+    profile_group_name,
+)
+from .message_service import (
+    insert_message,
+    insert_messages,
+    mark_read,
+    messages_after,
+    resolve_sync_point,
+)
+from .message_writer import MessageWriter, MessageWriterClosed, get_message_writer
+from .outbound import (
+    OVERFLOW_CLOSE_CODE,
+    OutboundQueue,
+    outbound_config,
+    outbound_stats,
+    start_stats_logger,
+)
+from .presence import PresenceService, get_presence
+
+__all__ = [
+    "MessageWriter",
+    "MessageWriterClosed",
+    "OVERFLOW_CLOSE_CODE",
+    "OutboundQueue",
+    "PresenceService",
+    "broadcast_chat_message",
+    "broadcast_read_receipt",
+    "get_message_writer",
+    "get_presence",
+    "insert_message",
+    "insert_messages",
+    "mark_read",
+    "match_group_name",
+    "messages_after",
+    "outbound_config",
+    "outbound_stats",
+    "profile_group_name",
+    "resolve_sync_point",
+    "start_stats_logger",
+]
@@ -0,0 +1,71 @@
+from datetime import datetime
+from uuid import UUID
+
+
+def match_group_name(match_id: UUID | str) -> str:
+    """Grupo de la sala de un Match (un socket por conversación)."""
+    return f"chat_{match_id}"
+
+
+def profile_group_name(profile_id: UUID | str) -> str:
+    """Grupo personal de un perfil (un socket para todas sus conversaciones)."""
+    return f"profile_{profile_id}"
+
+
+async def broadcast_chat_message(
+    channel_layer,
+    *,
+    match_id: UUID,
+    message_id: UUID,
+    sender_id: UUID,
+    recipient_id: UUID,
+    text: str,
+    created_at: datetime,
+) -> None:
+    """
+    Reparte un mensaje ya guardado a todos los sockets interesados:
+    la sala del Match y el grupo personal de cada participante.
+    El evento lleva el match_id para que el socket multiplexado sepa
+    a qué conversación pertenece.
+    """
+    event = {
+        "type": "chat_message",
+        "match_id": str(match_id),
+        "message_id": str(message_id),
+        "message": text,
+        "sender_id": str(sender_id),
+        "timestamp": str(created_at),
+    }
+    for group in (
+        match_group_name(match_id),
+        profile_group_name(sender_id),
+        profile_group_name(recipient_id),
+    ):
+        await channel_layer.group_send(group, event)
+
+
+async def broadcast_read_receipt(
+    channel_layer,
+    *,
+    match_id: UUID,
+    reader_id: UUID,
+    recipient_id: UUID,
+    up_to: UUID,
+) -> None:
+    """
+    Un único evento por lectura (no uno por mensaje): "el lector ha leído
+    todo hasta `up_to`". Llega a la sala y a los grupos personales, así
+    el resto de sockets del lector también limpian su badge.
+    """
+    event = {
+        "type": "chat_receipt",
+        "match_id": str(match_id),
+        "reader_id": str(reader_id),
+        "up_to": str(up_to),
+    }
+    for group in (
+        match_group_name(match_id),
+        profile_group_name(reader_id),
+        profile_group_name(recipient_id),
+    ):
+        await channel_layer.group_send(group, event)
@@ -0,0 +1,181 @@
+import uuid
+from datetime import UTC, datetime
+from uuid import UUID
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.matches.models import MatchParticipant
+
+from ..models import Message
+
+
+def insert_message(match_id: UUID, sender_id: UUID, text: str) -> Message:
+    """
+    Guarda un mensaje con una única sentencia, sin cargar el Match ni el
+    perfil: el llamante ya ha comprobado la pertenencia (ver ChatConsumer).
+
+    El mismo viaje a la BD sube la conversación en la bandeja de entrada
+    de ambos participantes y suma uno a los no leídos del destinatario
+    (lo que haría el post_save de Message).
+    """
+    message_table = Message._meta.db_table
+    participant_table = MatchParticipant._meta.db_table
+    sql = f"""
+        WITH inserted AS (
+            INSERT INTO {message_table} (id, match_id, sender_id, text, created_at, is_read)
+            VALUES (%s, %s, %s, %s, %s, false)
+            RETURNING id, match_id, sender_id, text, created_at, is_read
+        ),
+        touched AS (
+            UPDATE {participant_table} p
+            SET last_activity_at = inserted.created_at,
+                unread_count = p.unread_count
+                    + CASE WHEN p.profile_id = inserted.sender_id THEN 0 ELSE 1 END
+            FROM inserted
+            WHERE p.match_id = inserted.match_id
+        )
+        SELECT * FROM inserted
+    """
+    params = [uuid.uuid4(), match_id, sender_id, text, timezone.now()]
+    return next(iter(Message.objects.raw(sql, params)))
+
+
+def insert_messages(rows: list[tuple[UUID, UUID, str]]) -> list[Message]:
+    """
+    Versión por lotes de insert_message para el MessageWriter:
+    un único INSERT con bulk_create y un único UPDATE de los participantes
+    (recencia y no leídos), en la misma transacción.
+
+    Args:
+        rows: Lista de (match_id, sender_id, text)
+
+    Returns:
+        Los mensajes guardados, en el mismo orden que `rows`
+    """
+    messages = [
+        Message(match_id=match_id, sender_id=sender_id, text=text)
+        for match_id, sender_id, text in rows
+    ]
+    participant_table = MatchParticipant._meta.db_table
+    # Agrupa el lote por participante: fecha más reciente y cuántos
+    # mensajes le han llegado del otro lado
+    sql = f"""
+        UPDATE {participant_table} p
+        SET last_activity_at = GREATEST(p.last_activity_at, batch.last_at),
+            unread_count = p.unread_count + batch.received
+        FROM (
+            SELECT target.match_id,
+                   target.profile_id,
+                   MAX(m.created_at) AS last_at,
+                   COUNT(*) FILTER (WHERE m.sender_id <> target.profile_id) AS received
+            FROM unnest(%s::uuid[], %s::uuid[], %s::timestamptz[])
+                AS m (match_id, sender_id, created_at)
+            JOIN {participant_table} target ON target.match_id = m.match_id
+            GROUP BY target.match_id, target.profile_id
+        ) AS batch
+        WHERE p.match_id = batch.match_id AND p.profile_id = batch.profile_id
+    """
+    with transaction.atomic():
+        Message.objects.bulk_create(messages)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                [
+                    [message.match_id for message in messages],
+                    [message.sender_id for message in messages],
+                    [message.created_at for message in messages],
+                ],
+            )
+    return messages
+
+
+def resolve_sync_point(
+    match_id: UUID, since: str
+) -> tuple[datetime, UUID | None] | None:
+    """
+    Traduce el parámetro `since` del cliente a una posición (created_at, id):
+    - ID de mensaje: la posición de ese mensaje dentro del Match.
+    - Fecha ISO: todo lo posterior a ese instante.
+    Devuelve None si no se reconoce (el cliente se queda sin sincronizar).
+    """
+    try:
+        message_id = UUID(since)
+    except ValueError:
+        pass
+    else:
+        row = (
+            Message.objects.filter(match_id=match_id, id=message_id)
+            .values_list("created_at", "id")
+            .first()
+        )
+        return row
+
+    try:
+        created_at = parse_datetime(since)
+    except ValueError:
+        return None
+    if created_at is None:
+        return None
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at, UTC)
+    return created_at, None
+
+
+def messages_after(
+    match_id: UUID,
+    created_at: datetime,
+    message_id: UUID | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """
+    Siguiente tramo de mensajes posteriores a (created_at, id), del más
+    antiguo al más nuevo, sobre el índice (match, created_at).
+    """
+    position = Q(created_at__gt=created_at)
+    if message_id is not None:
+        position |= Q(created_at=created_at, id__gt=message_id)
+    return list(
+        Message.objects.filter(position, match_id=match_id)
+        .order_by("created_at", "id")
+        .values("id", "sender_id", "text", "created_at")[:limit]
+    )
+
+
+def mark_read(profile_id: UUID, match_id: UUID, up_to: UUID) -> tuple[int, int]:
+    """
+    Marca como leídos, con UNA sentencia, todos los mensajes recibidos en
+    el Match hasta `up_to` (incluido) y descuenta el contador del lector.
+    Solo toca filas no leídas (índice parcial message_unread_idx).
+
+    Returns:
+        Tupla (mensajes marcados, no leídos que quedan)
+    """
+    message_table = Message._meta.db_table
+    participant_table = MatchParticipant._meta.db_table
+    sql = f"""
+        WITH flipped AS (
+            UPDATE {message_table} m
+            SET is_read = true
+            WHERE m.match_id = %(match_id)s
+              AND NOT m.is_read
+              AND m.sender_id <> %(profile_id)s
+              AND (m.created_at, m.id) <= (
+                  SELECT up_to.created_at, up_to.id
+                  FROM {message_table} up_to
+                  WHERE up_to.id = %(up_to)s AND up_to.match_id = %(match_id)s
+              )
+            RETURNING 1
+        )
+        UPDATE {participant_table} p
+        SET unread_count = GREATEST(p.unread_count - (SELECT COUNT(*) FROM flipped), 0)
+        WHERE p.match_id = %(match_id)s AND p.profile_id = %(profile_id)s
+        RETURNING (SELECT COUNT(*) FROM flipped), p.unread_count
+    """
+    params = {"match_id": match_id, "profile_id": profile_id, "up_to": up_to}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return (row[0], row[1]) if row else (0, 0)
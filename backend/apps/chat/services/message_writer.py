@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+
+from ..models import Message
+from .message_service import insert_message, insert_messages
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": False,
+    # Filas máximas por INSERT
+    "MAX_BATCH": 100,
+    # Cuánto esperamos a que lleguen más mensajes antes de escribir
+    "MAX_DELAY_MS": 5,
+    # Mensajes en cola como máximo: por encima, submit() espera (backpressure)
+    "MAX_PENDING": 1000,
+}
+
+_PendingRow = tuple[UUID, UUID, str, asyncio.Future]
+
+
+class MessageWriterClosed(RuntimeError):
+    """El writer ya se ha cerrado (apagado): el mensaje no se ha guardado."""
+
+
+class MessageWriter:
+    """
+    "Group commit" de mensajes de chat para todo el proceso.
+
+    Los consumers encolan sus mensajes y esperan un Future; una única tarea
+    junta lo que llegue en MAX_DELAY_MS (o hasta MAX_BATCH filas) y lo guarda
+    con un solo bulk_create en un solo hilo del pool. Cada Future se resuelve
+    con su fila guardada, así el broadcast lleva el created_at real.
+
+    Al cerrar se escribe todo lo que haya en la cola (también lo que llegue
+    detrás de la marca de fin); lo que se encole después se rechaza.
+    """
+
+    def __init__(self, max_batch: int, max_delay_ms: float, max_pending: int):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: asyncio.Queue[_PendingRow | None] = asyncio.Queue(
+            maxsize=max_pending
+        )
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+    async def submit(self, match_id: UUID, sender_id: UUID, text: str) -> Message:
+        """Encola un mensaje y espera a que esté guardado."""
+        if self._closed:
+            raise MessageWriterClosed("MessageWriter cerrado.")
+        self._ensure_task()
+
+        future = asyncio.get_running_loop().create_future()
+        # Puede esperar (cola llena) y cerrarse el writer mientras tanto
+        await self._queue.put((match_id, sender_id, text, future))
+        if self._closed and self._task is not None and self._task.done():
+            # La tarea ya vació la cola y terminó: nadie guardaría este mensaje
+            raise MessageWriterClosed("MessageWriter cerrado.")
+        return await future
+
+    async def close(self) -> None:
+        """Deja de aceptar mensajes y escribe todo lo pendiente."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None and self._queue.empty():
+            return
+        # Marca de fin: la tarea escribe lo que quede en la cola y termina
+        self._ensure_task()
+        await self._queue.put(None)
+        await self._task
+
+    def _ensure_task(self) -> None:
+        """Arranca la tarea de escritura, o la rearranca si ha muerto."""
+        if self._task is not None and not self._task.done():
+            return
+        if self._task is not None and not self._task.cancelled():
+            if exc := self._task.exception():
+                logger.error("La tarea del MessageWriter murió", exc_info=exc)
+        self._task = asyncio.create_task(self._run(), name="chat-message-writer")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Lo que llegó detrás de la marca de fin también se escribe
+        while not self._queue.empty():
+            batch = [
+                item
+                for item in (
+                    self._queue.get_nowait()
+                    for _ in range(min(self.max_batch, self._queue.qsize()))
+                )
+                if item is not None
+            ]
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list[_PendingRow]) -> None:
+        rows = [(match_id, sender_id, text) for match_id, sender_id, text, _ in batch]
+        futures = [future for *_, future in batch]
+        try:
+            saved = await database_sync_to_async(_write_batch)(rows)
+        except Exception as exc:
+            logger.exception("Error guardando un lote de %d mensajes", len(rows))
+            saved = [exc] * len(rows)
+
+        for future, result in zip(futures, saved, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def _write_batch(rows: list[tuple[UUID, UUID, str]]) -> list[Message | Exception]:
+    try:
+        return list(insert_messages(rows))
+    except IntegrityError:
+        # Alguna fila apunta a un Match ya borrado: reintentamos una a una
+        # para que el fallo solo le llegue a quien corresponde.
+        results: list[Message | Exception] = []
+        for match_id, sender_id, text in rows:
+            try:
+                results.append(insert_message(match_id, sender_id, text))
+            except IntegrityError as exc:
+                results.append(exc)
+        return results
+
+
+_writer: MessageWriter | None = None
+
+
+def get_message_writer() -> MessageWriter | None:
+    """
+    Writer del proceso, o None si CHAT_MESSAGE_WRITER no está activado
+    (cada mensaje se guarda entonces en su propia transacción).
+    """
+    global _writer
+    config = {**DEFAULTS, **getattr(settings, "CHAT_MESSAGE_WRITER", {})}
+    if not config["ENABLED"]:
+        return None
+    if _writer is None:
+        _writer = MessageWriter(
+            max_batch=config["MAX_BATCH"],
+            max_delay_ms=config["MAX_DELAY_MS"],
+            max_pending=config["MAX_PENDING"],
+        )
+    return _writer
+
+
+async def close_message_writer() -> None:
+    """Vacía y cierra el writer del proceso (apagado del servidor)."""
+    global _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import weakref
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Frames pendientes como máximo por conexión
+    "MAX_QUEUE": 256,
+    # Frames que se juntan como mucho en un único envío {"type": "batch"}
+    "MAX_BATCH": 20,
+    # Cada cuántos segundos se registran las métricas (0 = nunca)
+    "STATS_INTERVAL": 60,
+}
+
+# Código de cierre cuando el cliente no consume lo bastante rápido
+OVERFLOW_CLOSE_CODE = 4008
+
+_counters = {
+    "frames": 0,
+    "sends": 0,
+    "dropped": 0,
+    "overflows": 0,
+    "send_errors": 0,
+}
+
+
+class OutboundQueue:
+    """
+    Cola de salida acotada de una conexión WebSocket.
+
+    Los handlers de eventos del grupo solo encolan (no esperan al socket);
+    una tarea por conexión envía lo acumulado, juntando varios frames en
+    uno solo {"type": "batch", "frames": [...]}. Un cliente lento llena
+    su propia cola, no la memoria del worker:
+
+    1. Con la cola llena se descartan primero los frames "descartables"
+       (presencia / escribiendo), que el siguiente lote vuelve a traer.
+    2. Si aun así no cabe, se cierra la conexión (OVERFLOW_CLOSE_CODE).
+       `on_overflow` recibe el ID del último mensaje entregado; el chat de
+       un Match lo pone como motivo y el cliente reanuda con ?since=<id>
+       (WebSocket) o ?after=<id> (REST).
+
+    Si el envío falla, la conexión se cierra del mismo modo.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        on_overflow: Callable[[str | None], Awaitable[None]],
+        *,
+        max_queue: int,
+        max_batch: int,
+    ):
+        self._send = send
+        self._on_overflow = on_overflow
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        # (frame, descartable)
+        self._frames: deque[tuple[dict[str, Any], bool]] = deque()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._close_task: asyncio.Task | None = None
+        self.last_delivered_id: str | None = None
+        self.overflowed = False
+        _queues.add(self)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def push(self, frame: dict[str, Any], *, droppable: bool = False) -> None:
+        """Encola un frame sin bloquear al handler que lo produce."""
+        if self.overflowed:
+            return
+        if len(self._frames) >= self.max_queue:
+            if droppable:
+                _counters["dropped"] += 1
+                return
+            if not self._drop_one():
+                self._overflow()
+                return
+
+        self._frames.append((frame, droppable))
+        self._ready.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="chat-outbound")
+
+    async def close(self) -> None:
+        """Para el envío y descarta lo pendiente (la conexión ya se cerró)."""
+        self._frames.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _drop_one(self) -> bool:
+        # Hace sitio quitando el frame descartable más antiguo
+        for index, (_, droppable) in enumerate(self._frames):
+            if droppable:
+                del self._frames[index]
+                _counters["dropped"] += 1
+                return True
+        return False
+
+    def _overflow(self) -> None:
+        _counters["overflows"] += 1
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._stop()
+
+    def _stop(self) -> None:
+        """Deja de enviar y cierra la conexión con el cursor para reanudar."""
+        self.overflowed = True
+        self._frames.clear()
+        # Guardamos la tarea: sin referencia podría recogerla el GC a medias
+        self._close_task = asyncio.create_task(
+            self._close_connection(), name="chat-outbound-close"
+        )
+
+    async def _close_connection(self) -> None:
+        try:
+            await self._on_overflow(self.last_delivered_id)
+        except Exception:
+            # El socket ya estaba roto: no queda nada que cerrar
+            logger.debug("No se pudo cerrar la conexión", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._frames:
+                batch = [
+                    self._frames.popleft()[0]
+                    for _ in range(min(self.max_batch, len(self._frames)))
+                ]
+                if len(batch) == 1:
+                    payload = batch[0]
+                else:
+                    payload = {"type": "batch", "frames": batch}
+                # Aquí es donde un cliente lento nos hace esperar
+                try:
+                    await self._send(json.dumps(payload))
+                except Exception:
+                    logger.warning("Error enviando por el socket", exc_info=True)
+                    _counters["send_errors"] += 1
+                    self._task = None
+                    self._stop()
+                    return
+
+                _counters["sends"] += 1
+                _counters["frames"] += len(batch)
+                for frame in reversed(batch):
+                    if frame.get("id"):
+                        self.last_delivered_id = frame["id"]
+                        break
+
+
+_queues: weakref.WeakSet[OutboundQueue] = weakref.WeakSet()
+_stats_task: asyncio.Task | None = None
+
+
+def outbound_config() -> dict[str, int]:
+    return {**DEFAULTS, **getattr(settings, "CHAT_OUTBOUND", {})}
+
+
+def outbound_stats() -> dict[str, int]:
+    """Métricas de las colas de salida de este proceso."""
+    depths = [len(queue) for queue in _queues]
+    return {
+        "connections": len(depths),
+        "queued": sum(depths),
+        "max_depth": max(depths, default=0),
+        **_counters,
+    }
+
+
+def start_stats_logger(interval: float) -> None:
+    """
+    Registra outbound_stats() cada `interval` segundos mientras haya
+    conexiones abiertas en este proceso (logger de este módulo, INFO).
+    """
+    global _stats_task
+    if interval and (_stats_task is None or _stats_task.done()):
+        _stats_task = asyncio.create_task(
+            _log_stats(interval), name="chat-outbound-stats"
+        )
+
+
+async def _log_stats(interval: float) -> None:
+    while _queues:
+        await asyncio.sleep(interval)
+        logger.info("Colas de salida del chat: %s", outbound_stats())
@@ -0,0 +1,247 @@
+import asyncio
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from uuid import UUID
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    # En memoria para tests/desarrollo; RedisPresenceBackend en producción
+    "BACKEND": "apps.chat.services.presence.InMemoryPresenceBackend",
+    "BACKEND_OPTIONS": {},
+    # Segundos que dura el estado "online" si nadie lo renueva
+    "TTL": 60,
+    # Espera antes de anunciar "offline" (una reconexión rápida no parpadea)
+    "OFFLINE_GRACE": 5,
+    # Como mucho un "escribiendo" por conexión y conversación cada N segundos
+    "TYPING_THROTTLE": 2,
+    # El cliente apaga el indicador si no se renueva en este tiempo
+    "TYPING_TIMEOUT": 5,
+    # Como mucho un broadcast de presencia por sala en cada intervalo
+    "BROADCAST_INTERVAL": 0.5,
+}
+
+
+class InMemoryPresenceBackend:
+    """Estado de presencia en el propio proceso (tests y un solo worker)."""
+
+    def __init__(self, **options):
+        self._expires: dict[str, float] = {}
+
+    async def touch(self, profile_id: UUID | str, ttl: float) -> None:
+        self._expires[str(profile_id)] = time.monotonic() + ttl
+
+    async def online(self, profile_ids: Iterable[UUID | str]) -> set[str]:
+        now = time.monotonic()
+        return {
+            profile_id
+            for profile_id in map(str, profile_ids)
+            if self._expires.get(profile_id, 0) > now
+        }
+
+
+class RedisPresenceBackend:
+    """
+    Una clave con TTL por perfil ("presence:<id>"): si ningún proceso la
+    renueva, caduca sola. Nunca toca Postgres.
+    """
+
+    key_prefix = "presence:"
+
+    def __init__(self, url: str | None = None, **options):
+        from redis import asyncio as aioredis
+
+        self._redis = aioredis.Redis.from_url(url or default_redis_url())
+
+    def _key(self, profile_id: UUID | str) -> str:
+        return f"{self.key_prefix}{profile_id}"
+
+    async def touch(self, profile_id: UUID | str, ttl: float) -> None:
+        await self._redis.set(self._key(profile_id), 1, px=int(ttl * 1000))
+
+    async def online(self, profile_ids: Iterable[UUID | str]) -> set[str]:
+        profile_ids = [str(profile_id) for profile_id in profile_ids]
+        if not profile_ids:
+            return set()
+        values = await self._redis.mget([self._key(p) for p in profile_ids])
+        return {
+            profile_id
+            for profile_id, value in zip(profile_ids, values, strict=True)
+            if value is not None
+        }
+
+
+def default_redis_url() -> str:
+    # Mismo Redis que la channel layer, en otra base de datos
+    host, port = settings.CHANNEL_LAYERS["default"]["CONFIG"]["hosts"][0]
+    return f"redis://{host}:{port}/1"
+
+
+class Throttle:
+    """Deja pasar como mucho un evento por clave cada `interval` segundos."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last: dict[str, float] = {}
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        if now - self._last.get(key, float("-inf")) < self.interval:
+            return False
+        self._last[key] = now
+        return True
+
+
+class PresenceBroadcaster:
+    """
+    Agrupa las actualizaciones de presencia por sala (grupo de Channels).
+
+    Dentro de un intervalo solo cuenta el último estado de cada perfil, y
+    cada sala recibe como mucho un group_send con todas las novedades:
+    miles de personas escribiendo no generan un mensaje por tecla.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: defaultdict[str, dict[str, dict]] = defaultdict(dict)
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+
+    def publish(self, group: str, profile_id: UUID | str, **state) -> None:
+        self._pending[group].setdefault(str(profile_id), {}).update(state)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="presence-broadcast")
+
+    async def _run(self) -> None:
+        channel_layer = get_channel_layer()
+        while self._pending:
+            await asyncio.sleep(self.interval)
+            batch, self._pending = self._pending, defaultdict(dict)
+            for group, updates in batch.items():
+                await channel_layer.group_send(
+                    group,
+                    {
+                        "type": "presence_batch",
+                        "updates": [
+                            {"profile_id": profile_id, **state}
+                            for profile_id, state in updates.items()
+                        ],
+                    },
+                )
+                self.sent += 1
+
+
+class PresenceService:
+    """
+    Presencia ("online") y "escribiendo" por perfil.
+
+    - El estado vive en el backend con TTL; un refresco periódico lo
+      mantiene mientras el perfil tenga sockets abiertos en este proceso.
+    - La transición a offline se retrasa OFFLINE_GRACE segundos
+      (debounce): si vuelve a conectarse antes, no se anuncia nada.
+    - Los broadcasts pasan por PresenceBroadcaster (coalescidos por sala).
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.backend = import_string(config["BACKEND"])(**config["BACKEND_OPTIONS"])
+        self.broadcaster = PresenceBroadcaster(config["BROADCAST_INTERVAL"])
+        self._local_connections: defaultdict[str, int] = defaultdict(int)
+        self._refresher: asyncio.Task | None = None
+        # El loop solo guarda referencias débiles a las tareas: sin esta,
+        # un aviso de "offline" pendiente podría recogerlo el GC
+        self._offline_tasks: set[asyncio.Task] = set()
+
+    def new_throttle(self) -> Throttle:
+        """Throttle de "escribiendo" para una conexión."""
+        return Throttle(self.config["TYPING_THROTTLE"])
+
+    async def connected(self, profile_id: UUID | str, groups: Iterable[str]) -> None:
+        profile_id = str(profile_id)
+        was_online = bool(await self.backend.online([profile_id]))
+        self._local_connections[profile_id] += 1
+        await self.backend.touch(profile_id, self.config["TTL"])
+        if not was_online:
+            self.announce(profile_id, groups, online=True)
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(
+                self._refresh_loop(), name="presence-refresh"
+            )
+
+    async def disconnected(self, profile_id: UUID | str, groups: Iterable[str]) -> None:
+        profile_id = str(profile_id)
+        self._local_connections[profile_id] -= 1
+        if self._local_connections[profile_id] > 0:
+            return
+        del self._local_connections[profile_id]
+
+        # Sin sockets en este proceso: el estado caduca tras la gracia,
+        # salvo que otra conexión (aquí o en otro proceso) lo renueve.
+        grace = self.config["OFFLINE_GRACE"]
+        await self.backend.touch(profile_id, grace)
+        task = asyncio.create_task(
+            self._announce_offline(profile_id, list(groups), grace),
+            name="presence-offline",
+        )
+        self._offline_tasks.add(task)
+        task.add_done_callback(self._offline_tasks.discard)
+
+    def announce(self, profile_id: UUID | str, groups: Iterable[str], **state) -> None:
+        """Publica un cambio de estado en varias salas (coalescido)."""
+        for group in groups:
+            self.broadcaster.publish(group, profile_id, **state)
+
+    def typing(
+        self,
+        throttle: Throttle,
+        profile_id: UUID | str,
+        match_id: UUID | str,
+        groups: Iterable[str],
+        active: bool,
+    ) -> None:
+        """
+        Publica "escribiendo" en una conversación. Los "sí" se limitan por
+        conexión; el "no" siempre pasa (y dentro del intervalo sustituye al
+        "sí" pendiente, así que el otro nunca ve un parpadeo).
+        """
+        match_id = str(match_id)
+        if active and not throttle.allow(match_id):
+            return
+        state = {"typing": active, "match_id": match_id}
+        if active:
+            state["expires_in"] = self.config["TYPING_TIMEOUT"]
+        self.announce(profile_id, groups, **state)
+
+    async def online(self, profile_ids: Iterable[UUID | str]) -> set[str]:
+        return await self.backend.online(profile_ids)
+
+    async def _announce_offline(self, profile_id: str, groups: list[str], grace: float):
+        await asyncio.sleep(grace)
+        if profile_id in self._local_connections:
+            return
+        if await self.backend.online([profile_id]):
+            return
+        self.announce(profile_id, groups, online=False, typing=False)
+
+    async def _refresh_loop(self) -> None:
+        ttl = self.config["TTL"]
+        while self._local_connections:
+            await asyncio.sleep(ttl / 3)
+            for profile_id in list(self._local_connections):
+                await self.backend.touch(profile_id, ttl)
+
+
+_presence: PresenceService | None = None
+
+
+def get_presence() -> PresenceService:
+    """Servicio de presencia del proceso (configurado con CHAT_PRESENCE)."""
+    global _presence
+    if _presence is None:
+        _presence = PresenceService(
+            {**DEFAULTS, **getattr(settings, "CHAT_PRESENCE", {})}
+        )
+    return _presence
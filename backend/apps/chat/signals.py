@@ -0,0 +1,38 @@
+from django.db.models import Case, F, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.matches.models import MatchParticipant
+from apps.users.models import CustomUser
+
+from .middleware import token_user_cache
+from .models import Message
+
+
+@receiver(post_save, sender=Message)
+def touch_conversation_on_message(sender, instance: Message, created: bool, **kwargs):
+    """
+    Sube la conversación al principio de la bandeja de entrada de los dos
+    participantes y suma uno a los no leídos del destinatario
+    (un UPDATE por la FK match, dos filas).
+    """
+    if created:
+        MatchParticipant.objects.filter(match_id=instance.match_id).update(
+            last_activity_at=instance.created_at,
+            unread_count=Case(
+                When(profile_id=instance.sender_id, then=F("unread_count")),
+                default=F("unread_count") + 1,
+            ),
+        )
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_token_cache_on_deactivation(sender, instance: CustomUser, **kwargs):
+    """Un usuario desactivado no puede reutilizar su sesión WebSocket cacheada."""
+    if not instance.is_active:
+        token_user_cache.invalidate_user(instance.id)
+
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_token_cache_on_delete(sender, instance: CustomUser, **kwargs):
+    token_user_cache.invalidate_user(instance.id)
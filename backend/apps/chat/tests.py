@@ -1 +1,361 @@
-# Create your tests here.
+import asyncio
+import gc
+import time
+from collections import Counter
+from datetime import date
+from unittest import mock
+from uuid import uuid4
+
+from django.db.models.signals import post_delete, post_save
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.matches.models import Match
+from apps.users.authentication import ProfileRefreshToken
+from apps.users.models import CustomUser, Profile
+
+from . import middleware
+from .consumers import ChatConsumer, UserChatConsumer
+from .middleware import get_user_from_token, token_user_cache
+from .models import Message
+from .services.message_writer import MessageWriter, MessageWriterClosed
+from .services.outbound import OVERFLOW_CLOSE_CODE, OutboundQueue
+from .services.presence import DEFAULTS, PresenceService
+
+
+class CountingChannelLayer:
+    """Channel layer falsa: solo cuenta los group_send por sala."""
+
+    def __init__(self):
+        self.sends = Counter()
+        self.max_updates = 0
+
+    async def group_send(self, group, message):
+        self.sends[group] += 1
+        self.max_updates = max(self.max_updates, len(message["updates"]))
+
+
+class PresenceLoadTests(SimpleTestCase):
+    """
+    Miles de personas escribiendo a la vez: el tráfico hacia la channel
+    layer queda acotado por salas x intervalos, no por pulsaciones.
+    """
+
+    rooms = 100
+    typists_per_room = 20
+    keystroke_interval = 0.005
+    duration = 0.5
+
+    async def test_typing_traffic_is_bounded_per_room_and_interval(self):
+        config = {
+            **DEFAULTS,
+            "BACKEND": "apps.chat.services.presence.InMemoryPresenceBackend",
+            "TYPING_THROTTLE": 0.1,
+            "BROADCAST_INTERVAL": 0.05,
+        }
+        layer = CountingChannelLayer()
+        with mock.patch(
+            "apps.chat.services.presence.get_channel_layer", return_value=layer
+        ):
+            presence = PresenceService(config)
+            typists = [
+                (f"room-{room}", f"profile-{room}-{i}", presence.new_throttle())
+                for room in range(self.rooms)
+                for i in range(self.typists_per_room)
+            ]
+
+            keystrokes = 0
+            started = time.monotonic()
+            while time.monotonic() - started < self.duration:
+                for group, profile_id, throttle in typists:
+                    presence.typing(throttle, profile_id, group, [group], True)
+                keystrokes += len(typists)
+                await asyncio.sleep(self.keystroke_interval)
+            elapsed = time.monotonic() - started
+
+            # Espera a que salga el último lote pendiente
+            await asyncio.sleep(2 * config["BROADCAST_INTERVAL"])
+
+        intervals = elapsed / config["BROADCAST_INTERVAL"]
+        self.assertEqual(len(layer.sends), self.rooms)
+        # Como mucho un envío por sala y por intervalo (+1 por el último lote)
+        self.assertLessEqual(max(layer.sends.values()), intervals + 2)
+        # Cada envío lleva como mucho un estado por perfil de la sala
+        self.assertLessEqual(layer.max_updates, self.typists_per_room)
+        self.assertLess(layer.sends.total(), keystrokes / 10)
+
+
+class PresenceOfflineTests(SimpleTestCase):
+    async def test_offline_is_announced_after_grace_even_after_gc(self):
+        config = {
+            **DEFAULTS,
+            "BACKEND": "apps.chat.services.presence.InMemoryPresenceBackend",
+            "OFFLINE_GRACE": 0.05,
+            "BROADCAST_INTERVAL": 0.01,
+        }
+        layer = CountingChannelLayer()
+        with mock.patch(
+            "apps.chat.services.presence.get_channel_layer", return_value=layer
+        ):
+            presence = PresenceService(config)
+            await presence.connected("profile", ["room"])
+            await asyncio.sleep(0.03)
+            await presence.disconnected("profile", ["room"])
+            # Nadie más guarda la tarea del aviso: el servicio la mantiene viva
+            gc.collect()
+            self.assertEqual(len(presence._offline_tasks), 1)
+
+            await asyncio.sleep(config["OFFLINE_GRACE"] + 0.05)
+
+        # "online" al conectar y "offline" tras la gracia
+        self.assertEqual(layer.sends["room"], 2)
+        self.assertEqual(presence._offline_tasks, set())
+
+
+class TokenUserCacheTests(SimpleTestCase):
+    def setUp(self):
+        token_user_cache.clear()
+        self.addCleanup(token_user_cache.clear)
+        self.user = CustomUser(id=uuid4(), email="ws@example.com", is_active=True)
+
+    def token_for(self, user):
+        token = AccessToken()
+        token["user_id"] = str(user.id)
+        return str(token)
+
+    async def test_reconnecting_with_the_same_token_skips_the_database(self):
+        token = self.token_for(self.user)
+        load_user = mock.AsyncMock(return_value=self.user)
+
+        with mock.patch("apps.chat.middleware._load_user", load_user):
+            first = await get_user_from_token(token)
+            second = await get_user_from_token(token)
+
+        self.assertIs(first, self.user)
+        self.assertIs(second, self.user)
+        load_user.assert_awaited_once()
+        self.assertEqual(token_user_cache.stats()["hits"], 1)
+        self.assertEqual(token_user_cache.stats()["hit_rate"], 0.5)
+
+    def test_entry_expires_with_the_token(self):
+        key = ("jti", str(self.user.id))
+        token_user_cache.set(key, self.user, time.time() - 1)
+
+        self.assertIsNone(token_user_cache.get(key))
+        self.assertEqual(len(token_user_cache), 0)
+        self.assertEqual(token_user_cache.stats()["misses"], 1)
+
+    def test_deactivating_a_user_drops_their_entries(self):
+        other = CustomUser(id=uuid4(), email="other@example.com")
+        expires_at = time.time() + 60
+        for jti in ("a", "b"):
+            token_user_cache.set((jti, str(self.user.id)), self.user, expires_at)
+        token_user_cache.set(("c", str(other.id)), other, expires_at)
+
+        self.user.is_active = False
+        post_save.send(sender=CustomUser, instance=self.user, created=False)
+
+        self.assertIsNone(token_user_cache.get(("a", str(self.user.id))))
+        self.assertIsNone(token_user_cache.get(("b", str(self.user.id))))
+        self.assertIs(token_user_cache.get(("c", str(other.id))), other)
+
+    def test_deleting_a_user_drops_their_entries(self):
+        key = ("a", str(self.user.id))
+        token_user_cache.set(key, self.user, time.time() + 60)
+
+        post_delete.send(sender=CustomUser, instance=self.user)
+
+        self.assertIsNone(token_user_cache.get(key))
+
+    async def test_stats_are_logged_periodically(self):
+        token_user_cache.set(("a", str(self.user.id)), self.user, time.time() + 60)
+
+        with self.assertLogs("apps.chat.middleware", "INFO") as logs:
+            middleware.start_stats_logger(0.01)
+            await asyncio.sleep(0.05)
+        middleware._stats_task.cancel()
+
+        self.assertIn("hit_rate", logs.output[0])
+
+
+def fake_write_batch(rows):
+    # Sin base de datos: la "fila guardada" es el propio texto
+    return [text for _, _, text in rows]
+
+
+@mock.patch("apps.chat.services.message_writer._write_batch", fake_write_batch)
+class MessageWriterTests(SimpleTestCase):
+    def make_writer(self, **options):
+        return MessageWriter(
+            **{"max_batch": 10, "max_delay_ms": 1, "max_pending": 100, **options}
+        )
+
+    async def test_close_writes_everything_pending(self):
+        writer = self.make_writer(max_delay_ms=60_000)
+        submits = [
+            asyncio.create_task(writer.submit("match", "sender", f"m{i}"))
+            for i in range(25)
+        ]
+        await asyncio.sleep(0)
+
+        await writer.close()
+
+        self.assertEqual(await asyncio.gather(*submits), [f"m{i}" for i in range(25)])
+
+    async def test_submit_after_close_is_rejected(self):
+        writer = self.make_writer()
+        await writer.submit("match", "sender", "before")
+        await writer.close()
+
+        with self.assertRaises(MessageWriterClosed):
+            await asyncio.wait_for(writer.submit("match", "sender", "after"), 1)
+
+    async def test_submit_waiting_on_a_full_queue_when_closing_is_not_lost(self):
+        writer = self.make_writer(max_pending=1, max_delay_ms=60_000)
+        first = asyncio.create_task(writer.submit("match", "sender", "first"))
+        await asyncio.sleep(0)
+        # La cola está llena: este se queda esperando en put()
+        blocked = asyncio.create_task(writer.submit("match", "sender", "blocked"))
+        await asyncio.sleep(0)
+
+        await writer.close()
+
+        self.assertEqual(await first, "first")
+        self.assertEqual(await asyncio.wait_for(blocked, 1), "blocked")
+
+    async def test_dead_task_is_restarted(self):
+        writer = self.make_writer()
+        await writer.submit("match", "sender", "first")
+        writer._task.cancel()
+        await asyncio.sleep(0)
+
+        saved = await asyncio.wait_for(writer.submit("match", "sender", "second"), 1)
+
+        self.assertEqual(saved, "second")
+        await writer.close()
+
+
+class OutboundQueueTests(SimpleTestCase):
+    def make_queue(self, send, **options):
+        self.closed = []
+
+        async def on_overflow(resume_from):
+            self.closed.append(resume_from)
+
+        return OutboundQueue(
+            send, on_overflow, **{"max_queue": 4, "max_batch": 2, **options}
+        )
+
+    async def test_full_queue_closes_with_last_delivered_id(self):
+        sent = []
+
+        async def send(text):
+            sent.append(text)
+
+        queue = self.make_queue(send)
+        queue.push({"id": "m0"})
+        await asyncio.sleep(0.01)
+        for i in range(5):
+            queue.push({"id": f"m{i + 1}"})
+        await queue._close_task
+
+        self.assertEqual(self.closed, ["m0"])
+        self.assertTrue(queue.overflowed)
+        self.assertEqual(len(queue), 0)
+
+    async def test_send_error_closes_the_connection(self):
+        async def send(text):
+            raise ConnectionResetError
+
+        queue = self.make_queue(send)
+        with self.assertLogs("apps.chat.services.outbound", "WARNING"):
+            queue.push({"id": "m0"})
+            await asyncio.sleep(0.01)
+            await queue._close_task
+
+        self.assertEqual(self.closed, [None])
+        # Lo que llegue después ya no se encola
+        queue.push({"id": "m1"})
+        self.assertEqual(len(queue), 0)
+
+
+class OverflowCloseReasonTests(SimpleTestCase):
+    async def close_overflowed(self, consumer_class):
+        consumer = consumer_class()
+        consumer.close = mock.AsyncMock()
+        await consumer.close_overflowed("last-id")
+        return consumer.close
+
+    async def test_match_chat_sends_the_resume_id(self):
+        close = await self.close_overflowed(ChatConsumer)
+
+        close.assert_awaited_once_with(code=OVERFLOW_CLOSE_CODE, reason="last-id")
+
+    async def test_multiplexed_chat_sends_no_single_resume_id(self):
+        # El id sería de una sola conversación: el cliente usa los suyos
+        close = await self.close_overflowed(UserChatConsumer)
+
+        close.assert_awaited_once_with(code=OVERFLOW_CLOSE_CODE)
+
+
+class MessageHistoryPaginationTests(APITestCase):
+    url = "/api/chat/messages/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("me@example.com", "pass")
+        me, other = Profile.objects.bulk_create(
+            Profile(
+                custom_user=user,
+                first_name="chat",
+                birth_date=date(1995, 6, 15),
+                gender=Profile.Gender.OTHER,
+            )
+            for user in [
+                cls.user,
+                CustomUser.objects.create_user("other@example.com", "pass"),
+            ]
+        )
+        cls.match = Match.objects.create(user_a=me, user_b=other)
+        for i in range(3):
+            Message.objects.create(match=cls.match, sender=other, text=f"m{i}")
+
+    def setUp(self):
+        token = ProfileRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_after_with_nothing_newer_returns_empty_page_and_same_cursor(self):
+        latest = self.client.get(self.url, {"match_id": self.match.id})
+        newer = latest.data["newer"]
+
+        # Reconexión sin mensajes nuevos
+        response = self.client.get(newer)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+        self.assertIsNone(response.data["next"])
+        # El cliente puede seguir preguntando con el mismo cursor
+        self.assertEqual(response.data["newer"], newer)
+
+    def test_after_accepts_the_last_received_message_id(self):
+        # Lo que manda el WebSocket al cerrar por OVERFLOW_CLOSE_CODE
+        first = Message.objects.filter(match=self.match).earliest("created_at")
+
+        response = self.client.get(
+            self.url, {"match_id": self.match.id, "after": first.id}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m["text"] for m in response.data["results"]], ["m1", "m2"])
+
+    def test_after_with_an_unknown_message_id_is_not_found(self):
+        response = self.client.get(
+            self.url,
+            {
+                "match_id": self.match.id,
+                "after": "00000000-0000-0000-0000-000000000000",
+            },
+        )
+
+        self.assertEqual(response.status_code, 404)
@@ -1,9 +1,11 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import MessageViewSet
+from .views import InboxViewSet, MessageViewSet
 
 router = DefaultRouter()
 # Ruta: /api/chat/messages/?match_id=...
 router.register(r"messages", MessageViewSet, basename="messages")
+# Ruta: /api/chat/inbox/
+router.register(r"inbox", InboxViewSet, basename="inbox")
 
 urlpatterns = router.urls
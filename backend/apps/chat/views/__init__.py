@@ -1,3 +1,4 @@
+from .inbox_view import InboxViewSet
 from .message_view import MessageViewSet
 
-__all__ = ["MessageViewSet"]
+__all__ = ["MessageViewSet", "InboxViewSet"]
@@ -0,0 +1,49 @@
+from typing import Any
+
+from django.db.models import JSONField, OuterRef, Subquery
+from django.db.models.functions import JSONObject
+from rest_framework import mixins, viewsets
+from rest_framework.permissions import IsAuthenticated
+
+from apps.chat.models import Message
+from apps.chat.pagination import InboxCursorPagination
+from apps.chat.serializers import InboxSerializer
+from apps.matches.models import MatchParticipant
+from apps.users.permissions import HasProfile
+
+
+class InboxViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
+    """
+    Bandeja de entrada: cada conversación con su último mensaje, los no
+    leídos y la tarjeta del otro usuario.
+
+    Número fijo de queries sea cual sea el tamaño de la página:
+    1 para las conversaciones (el último mensaje con una subconsulta
+    correlacionada por fila sobre el índice de Message; los no leídos son
+    un contador de MatchParticipant) y 1 prefetch de fotos.
+    """
+
+    serializer_class = InboxSerializer
+    permission_classes = [IsAuthenticated, HasProfile]
+    pagination_class = InboxCursorPagination
+
+    def get_queryset(self):
+        user: Any = self.request.user
+
+        messages = Message.objects.filter(match_id=OuterRef("match_id"))
+
+        # Último mensaje: un único Index Scan Backward sobre (match, created_at)
+        last_message = messages.order_by("-created_at").values(
+            data=JSONObject(
+                id="id", text="text", sender_id="sender_id", created_at="created_at"
+            )
+        )[:1]
+
+        return (
+            MatchParticipant.objects.filter(profile_id=user.profile_id, is_active=True)
+            .select_related("other_profile__custom_user")
+            .prefetch_related("other_profile__photos")
+            .annotate(
+                last_message=Subquery(last_message, output_field=JSONField()),
+            )
+        )
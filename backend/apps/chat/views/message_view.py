@@ -1,15 +1,27 @@
-from django.core.exceptions import ObjectDoesNotExist
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from rest_framework import exceptions, mixins, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from apps.chat.models import Message
-from apps.chat.serializers import MessageSerializer
-from apps.matches.models import Match
+from apps.chat.pagination import MessageCursorPagination
+from apps.chat.serializers import MarkReadSerializer, MessageSerializer
+from apps.chat.services import broadcast_read_receipt, mark_read
+from apps.matches.models import Match, MatchParticipant
 
 
 class MessageViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    # Páginas de tamaño fijo con cursores ?before= / ?after= (ver la clase)
+    pagination_class = MessageCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == "mark_read":
+            return MarkReadSerializer
+        return MessageSerializer
 
     def get_queryset(self):
         """
@@ -24,18 +36,48 @@ class MessageViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
 
         # 1. Verificar que el Match existe y que YO soy parte de él
         # Esto evita que alguien lea chats ajenos cambiando el ID
-        try:
-            match = Match.objects.get(id=match_id)
-        except ObjectDoesNotExist:
-            raise exceptions.NotFound("Match no encontrado") from None
-
-        user_profile = self.request.user.profile
-        if user_profile != match.user_a and user_profile != match.user_b:
+        # Una sola consulta por la clave primaria (profile, match) de MatchParticipant
+        is_member = MatchParticipant.objects.filter(
+            profile_id=self.request.user.profile_id, match_id=match_id
+        ).exists()
+        if not is_member:
+            if not Match.objects.filter(id=match_id).exists():
+                raise exceptions.NotFound("Match no encontrado")
             raise exceptions.PermissionDenied("No tienes permiso para ver este chat.")
 
-        # 2. Devolver mensajes ordenados (los más recientes primero para paginación inversa)
-        return (
-            Message.objects.filter(match=match)
-            .select_related("sender")  # Util para evitar la N+1 query con el serializer
-            .order_by("-created_at")
+        # 2. El orden (y la dirección) lo pone la paginación por cursor.
+        # is_me compara sender_id: no hace falta el JOIN con el perfil.
+        return Message.objects.filter(match_id=match_id)
+
+    # URL: POST /api/chat/messages/mark-read/
+    @action(detail=False, methods=["post"], url_path="mark-read")
+    def mark_read(self, request):
+        """
+        Marca como leídos todos los mensajes recibidos hasta 'up_to' (un UPDATE)
+        y avisa al otro participante con un único receipt.
+        Body: {"match_id": "<uuid>", "up_to": "<id de mensaje>"}
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        match_id = serializer.validated_data["match_id"]
+        up_to = serializer.validated_data["up_to"]
+        profile_id = request.user.profile_id
+
+        other_profile_id = (
+            MatchParticipant.objects.filter(profile_id=profile_id, match_id=match_id)
+            .values_list("other_profile_id", flat=True)
+            .first()
         )
+        if other_profile_id is None:
+            raise exceptions.NotFound("Match no encontrado")
+
+        marked, unread_count = mark_read(profile_id, match_id, up_to)
+        if marked:
+            async_to_sync(broadcast_read_receipt)(
+                get_channel_layer(),
+                match_id=match_id,
+                reader_id=profile_id,
+                recipient_id=other_profile_id,
+                up_to=up_to,
+            )
+        return Response({"marked": marked, "unread_count": unread_count})
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0002_block'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='swipe',
+            name='idempotency_key',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
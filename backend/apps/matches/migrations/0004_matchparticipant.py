@@ -0,0 +1,59 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_participants(apps, schema_editor):
+    Match = apps.get_model("matches", "Match")
+    MatchParticipant = apps.get_model("matches", "MatchParticipant")
+
+    batch = []
+    for match in Match.objects.only("id", "user_a_id", "user_b_id", "created_at").iterator(
+        chunk_size=1000
+    ):
+        batch.append(
+            MatchParticipant(
+                match_id=match.id,
+                profile_id=match.user_a_id,
+                other_profile_id=match.user_b_id,
+                created_at=match.created_at,
+            )
+        )
+        batch.append(
+            MatchParticipant(
+                match_id=match.id,
+                profile_id=match.user_b_id,
+                other_profile_id=match.user_a_id,
+                created_at=match.created_at,
+            )
+        )
+        if len(batch) >= 1000:
+            MatchParticipant.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    MatchParticipant.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0003_swipe_idempotency_key'),
+        ('users', '0006_profile_matching_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchParticipant',
+            fields=[
+                ('pk', models.CompositePrimaryKey('profile_id', 'match_id', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='matches.match')),
+                ('other_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.profile')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_participations', to='users.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', '-created_at'], name='participant_profile_recent_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    MatchParticipant = apps.get_model("matches", "MatchParticipant")
+    MatchParticipant.objects.update(last_activity_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0004_matchparticipant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchparticipant',
+            name='last_activity_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='matchparticipant',
+            name='last_activity_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='matchparticipant',
+            index=models.Index(fields=['profile', '-last_activity_at'], name='participant_profile_inbox_idx'),
+        ),
+    ]
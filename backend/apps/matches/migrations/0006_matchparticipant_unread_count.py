@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0005_matchparticipant_last_activity_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
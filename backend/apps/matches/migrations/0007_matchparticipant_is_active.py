@@ -0,0 +1,44 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:28
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def copy_match_is_active(apps, schema_editor):
+    Match = apps.get_model("matches", "Match")
+    MatchParticipant = apps.get_model("matches", "MatchParticipant")
+    inactive = Match.objects.filter(pk=OuterRef("match_id"), is_active=False)
+    MatchParticipant.objects.filter(Exists(inactive)).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0006_matchparticipant_unread_count'),
+        ('users', '0010_profile_main_photo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='matchparticipant',
+            name='participant_profile_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='matchparticipant',
+            name='participant_profile_inbox_idx',
+        ),
+        migrations.AddField(
+            model_name='matchparticipant',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(copy_match_is_active, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='matchparticipant',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['profile', '-created_at'], name='participant_profile_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchparticipant',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['profile', '-last_activity_at'], name='participant_profile_inbox_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from .block import Block
 from .match import Match
+from .participant import MatchParticipant
 from .swipe import Swipe
 
-__all__ = ["Match", "Swipe", "Block"]
+__all__ = ["Match", "MatchParticipant", "Swipe", "Block"]
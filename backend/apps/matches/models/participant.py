@@ -0,0 +1,57 @@
+from django.db import models
+
+from apps.users.models import Profile
+
+from .match import Match
+
+
+class MatchParticipant(models.Model):
+    """
+    Fila desnormalizada "perfil -> match" (dos por cada Match).
+
+    Match guarda la pareja como (user_a, user_b); buscar "mis matches" exige
+    un OR que no usa un único índice. Aquí cada perfil tiene su propia fila
+    con el otro lado ya resuelto, y el índice (profile, -created_at) sirve
+    la lista ya ordenada con un único range scan.
+    """
+
+    pk = models.CompositePrimaryKey("profile_id", "match_id")
+    match = models.ForeignKey(
+        Match, on_delete=models.CASCADE, related_name="participants"
+    )
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="match_participations"
+    )
+    other_profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="+"
+    )
+    # Copia de Match.created_at para ordenar sin tocar la tabla match
+    created_at = models.DateTimeField()
+    # Fecha del último mensaje (o del match si aún no hay ninguno).
+    # Ordena la bandeja de entrada por recencia sin mirar la tabla de mensajes.
+    last_activity_at = models.DateTimeField()
+    # Copia de Match.is_active: las listas filtran sin unirse a la tabla match
+    is_active = models.BooleanField(default=True)
+    # Mensajes del otro que este perfil aún no ha leído (contador del badge).
+    # Se mantiene al insertar mensajes y al marcarlos como leídos.
+    unread_count = models.PositiveIntegerField(default=0)
+
+    objects = models.Manager()
+
+    class Meta:
+        # Parciales: las listas solo muestran matches activos
+        indexes = [
+            models.Index(
+                fields=["profile", "-created_at"],
+                condition=models.Q(is_active=True),
+                name="participant_profile_recent_idx",
+            ),
+            models.Index(
+                fields=["profile", "-last_activity_at"],
+                condition=models.Q(is_active=True),
+                name="participant_profile_inbox_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.profile_id} en {self.match_id}"
@@ -26,6 +26,9 @@ class Swipe(models.Model):
     value = models.CharField(max_length=10, choices=SwipeType.choices)
     # IMPORTANTE: db_index=True para que las consultas de "votos de hoy" sean rápidas
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Clave opcional que manda el cliente (cabecera Idempotency-Key).
+    # Permite distinguir un reintento de red de un voto repetido.
+    idempotency_key = models.UUIDField(null=True, blank=True, editable=False)
 
     objects = models.Manager()
 
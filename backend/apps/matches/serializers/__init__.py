@@ -1,10 +1,16 @@
 from .block_serializer import BlockSerializer
-from .match_serializer import MatchSerializer
-from .swipe_serializer import CurrentProfileDefault, SwipeSerializer
+from .match_serializer import MatchParticipantSerializer, MatchSerializer
+from .swipe_serializer import (
+    BulkSwipeSerializer,
+    CurrentProfileDefault,
+    SwipeSerializer,
+)
 
 __all__ = [
     "MatchSerializer",
+    "MatchParticipantSerializer",
     "SwipeSerializer",
+    "BulkSwipeSerializer",
     "BlockSerializer",
     "CurrentProfileDefault",
 ]
@@ -2,7 +2,7 @@ from rest_framework import serializers
 
 from apps.users.serializers import PublicProfileSerializer
 
-from ..models import Match
+from ..models import Match, MatchParticipant
 
 
 class MatchSerializer(serializers.ModelSerializer):
@@ -20,11 +20,31 @@ class MatchSerializer(serializers.ModelSerializer):
         if not request:
             return None
 
-        current_profile = request.user.profile
-        target = obj.user_b if obj.user_a == current_profile else obj.user_a
+        current_profile_id = request.user.profile_id
+        target = obj.user_b if obj.user_a_id == current_profile_id else obj.user_a
         return PublicProfileSerializer(target, context=self.context).data
 
     def get_distance(self, obj):
         if hasattr(obj, "distance_val") and obj.distance_val:
             return f"{obj.distance_val.km:.2f} km"  # O obj.distance_val.m
         return None
+
+
+class MatchParticipantSerializer(serializers.ModelSerializer):
+    """
+    Misma forma que MatchSerializer pero leyendo desde MatchParticipant:
+    el "otro" ya viene resuelto en la fila, sin decidirlo en Python.
+    """
+
+    id = serializers.UUIDField(source="match_id", read_only=True)
+    other_user = PublicProfileSerializer(source="other_profile", read_only=True)
+    distance = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MatchParticipant
+        fields = ["id", "created_at", "other_user", "distance"]
+
+    def get_distance(self, obj):
+        if getattr(obj, "distance_val", None):
+            return f"{obj.distance_val.km:.2f} km"
+        return None
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
+
+from apps.users.models import Profile
 
 from ..models import Swipe
 
@@ -27,13 +28,9 @@ class SwipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Swipe
         fields = ["target", "value", "swiper"]
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Swipe.objects.all(),
-                fields=["swiper", "target"],
-                message="Ya has votado a este usuario anteriormente.",
-            )
-        ]
+        # Sin UniqueTogetherValidator: el duplicado lo resuelve el upsert
+        # (INSERT ... ON CONFLICT) en la capa de servicio, sin SELECT previo.
+        validators = []
 
     def validate_target(self, value):
         """
@@ -41,6 +38,44 @@ class SwipeSerializer(serializers.ModelSerializer):
         """
         # Obtenemos el perfil del contexto (ya validado por el default si se prefiere)
         request = self.context.get("request")
-        if request and value == request.user.profile:
+        if request and value.id == request.user.profile_id:
             raise serializers.ValidationError("No puedes darte like a ti mismo.")
         return value
+
+
+class SwipeItemSerializer(serializers.Serializer):
+    """Un voto dentro de un lote (solo IDs: nada de una query por elemento)."""
+
+    target = serializers.UUIDField()
+    value = serializers.ChoiceField(choices=Swipe.SwipeType.choices)
+
+
+class BulkSwipeSerializer(serializers.Serializer):
+    """
+    Lote de swipes (ráfagas del cliente móvil).
+    Valida todos los destinos con UNA sola query.
+    """
+
+    MAX_BATCH = 50
+
+    swipes = SwipeItemSerializer(many=True, allow_empty=False, max_length=MAX_BATCH)
+
+    def validate_swipes(self, items):
+        request = self.context["request"]
+        own_id = request.user.profile_id
+
+        targets = [item["target"] for item in items]
+        if len(set(targets)) != len(targets):
+            raise serializers.ValidationError("Hay usuarios repetidos en el lote.")
+        if own_id in targets:
+            raise serializers.ValidationError("No puedes darte like a ti mismo.")
+
+        existing = set(
+            Profile.objects.filter(id__in=targets).values_list("id", flat=True)
+        )
+        missing = [str(target) for target in targets if target not in existing]
+        if missing:
+            raise serializers.ValidationError(
+                f"Perfiles no encontrados: {', '.join(missing)}"
+            )
+        return items
@@ -1,48 +1,258 @@
 from __future__ import annotations
 
+import uuid
 from typing import TYPE_CHECKING
+from uuid import UUID
 
-from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-from ..models import Match, Swipe
+from apps.users.services import discard_from_deck
+
+from ..models import Match, MatchParticipant, Swipe
 
 if TYPE_CHECKING:
     from apps.users.models import Profile
 
+POSITIVE_SWIPES = [Swipe.SwipeType.LIKE, Swipe.SwipeType.SUPERLIKE]
+
+
+def _ordered_pair(first_id: UUID, second_id: UUID) -> tuple[UUID, UUID]:
+    """Pareja (ID menor, ID mayor), igual que Match.clean()."""
+    return (first_id, second_id) if first_id < second_id else (second_id, first_id)
+
+
+def _lock_pairs(pairs: list[tuple[UUID, UUID]]) -> None:
+    """
+    Advisory lock de Postgres por PAREJA (no por fila ni por perfil).
+    Se libera solo al terminar la transacción.
+
+    Serializa únicamente a los dos miembros de una misma pareja, así un
+    perfil popular puede recibir miles de likes a la vez sin que los
+    escritores se esperen entre sí. Las claves se piden ordenadas para
+    que dos lotes no puedan bloquearse mutuamente (deadlock).
+    """
+    keys = sorted(f"match:{a}:{b}" for a, b in pairs)
+    if not keys:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtextextended(k, 0)) "
+            "FROM unnest(%s::text[]) AS k ORDER BY k",
+            [keys],
+        )
+
+
+def _insert_matches_if_reciprocal(
+    swiper_id: UUID, other_ids: list[UUID]
+) -> list[Match]:
+    """
+    Crea en UNA sentencia el Match con cada perfil de `other_ids` que ya
+    nos haya dado like. Si el Match ya existía devuelve la fila existente,
+    con `inserted=False` (solo las filas nuevas tienen xmax = 0).
+    Debe ejecutarse con el lock de las parejas tomado (ver _lock_pairs).
+    """
+    match_table = Match._meta.db_table
+    swipe_table = Swipe._meta.db_table
+    participant_table = MatchParticipant._meta.db_table
+    # Con READ COMMITTED cada sentencia ve lo confirmado hasta ese momento:
+    # tras esperar el lock, vemos el like del otro aunque llegase a la vez.
+    # El CTE da de alta también las dos filas de MatchParticipant (el raw
+    # no dispara post_save); en un Match ya existente no inserta nada.
+    # Van todas las columnas: Django no deja DEFAULT en la BD para los
+    # campos con default (unread_count), sin ellas el INSERT falla.
+    sql = f"""
+        WITH upserted AS (
+            INSERT INTO {match_table} (id, user_a_id, user_b_id, created_at, is_active)
+            SELECT gen_random_uuid(),
+                   LEAST(s.target_id, s.swiper_id),
+                   GREATEST(s.target_id, s.swiper_id),
+                   %s,
+                   true
+            FROM {swipe_table} s
+            WHERE s.target_id = %s
+              AND s.swiper_id = ANY(%s::uuid[])
+              AND s.value = ANY(%s)
+            ON CONFLICT (user_a_id, user_b_id)
+            DO UPDATE SET user_a_id = EXCLUDED.user_a_id
+            RETURNING id, user_a_id, user_b_id, created_at, is_active,
+                      (xmax = 0) AS inserted
+        ),
+        participants AS (
+            INSERT INTO {participant_table}
+                (profile_id, match_id, other_profile_id, created_at,
+                 last_activity_at, is_active, unread_count)
+            SELECT side.profile_id, m.id, side.other_profile_id,
+                   m.created_at, m.created_at, m.is_active, 0
+            FROM upserted m
+            CROSS JOIN LATERAL (
+                VALUES (m.user_a_id, m.user_b_id), (m.user_b_id, m.user_a_id)
+            ) AS side (profile_id, other_profile_id)
+            ON CONFLICT DO NOTHING
+        )
+        SELECT * FROM upserted
+    """
+    values = [swipe_type.value for swipe_type in POSITIVE_SWIPES]
+    params = [timezone.now(), swiper_id, other_ids, values]
+    return list(Match.objects.raw(sql, params))
+
+
+def create_match_if_reciprocal(swiper_id: UUID, target_id: UUID) -> Match | None:
+    """
+    Camino de match sin row locks: lock por pareja + un único
+    INSERT ... SELECT ... ON CONFLICT que solo inserta si existe el like
+    recíproco. Sustituye al select_for_update + get_or_create.
+    """
+    _lock_pairs([_ordered_pair(swiper_id, target_id)])
+    matches = _insert_matches_if_reciprocal(swiper_id, [target_id])
+    return matches[0] if matches else None
+
+
+def upsert_swipe(
+    swiper: Profile,
+    target: Profile,
+    value: str,
+    idempotency_key: UUID | None = None,
+) -> tuple[Swipe, bool]:
+    """
+    Crea el Swipe con un único INSERT ... ON CONFLICT (swiper, target).
+    Si ya existía, devuelve la fila existente en el mismo viaje a la BD
+    (sin SELECT previo ni IntegrityError por condición de carrera).
+
+    Returns:
+        Tupla (swipe, created)
+    """
+    if swiper.id == target.id:
+        raise ValidationError(_("No puedes darte like a ti mismo."))
+
+    # La tabla sale de _meta; todos los valores van parametrizados.
+    table = Swipe._meta.db_table
+    # El DO UPDATE "vacío" existe para que RETURNING devuelva también la
+    # fila existente (con DO NOTHING no devolvería nada).
+    # xmax = 0 solo en filas recién insertadas.
+    sql = f"""
+        INSERT INTO {table} (id, swiper_id, target_id, value, created_at, idempotency_key)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (swiper_id, target_id)
+        DO UPDATE SET swiper_id = EXCLUDED.swiper_id
+        RETURNING id, swiper_id, target_id, value, created_at, idempotency_key,
+                  (xmax = 0) AS inserted
+    """
+    params = [
+        uuid.uuid4(),
+        swiper.id,
+        target.id,
+        value,
+        timezone.now(),
+        idempotency_key,
+    ]
 
-def create_swipe_and_check_match(swiper: Profile, target: Profile, value: str):
+    swipe = next(iter(Swipe.objects.raw(sql, params)))
+    return swipe, swipe.inserted
+
+
+def create_swipe_and_check_match(
+    swiper: Profile,
+    target: Profile,
+    value: str,
+    idempotency_key: UUID | None = None,
+):
     """
     Orquesta la creación del Swipe y verifica si hay Match.
-    Retorna una tupla: (swipe_instance, match_instance_o_None)
+    Retorna una tupla: (swipe_instance, match_instance_o_None, created)
+
+    Si el swipe ya existía, created=False y no se toca nada más:
+    la vista decide si es un reintento (misma idempotency_key) o un voto repetido.
     """
 
     # Usamos atomicidad: O se hace todo bien, o no se hace nada en la BD
     with transaction.atomic():
-        # 1. Crear el Swipe
-        swipe = Swipe.objects.create(swiper=swiper, target=target, value=value)
+        # 1. Crear el Swipe (o recuperar el existente)
+        swipe, created = upsert_swipe(swiper, target, value, idempotency_key)
+
+        # Sacamos al votado del mazo del feed (sin reconstruirlo)
+        if created:
+            discard_from_deck(swiper.id, [target.id])
 
         match = None
 
-        # 2. Lógica de Match (Solo si es Like/Superlike)
-        if value in [Swipe.SwipeType.LIKE, Swipe.SwipeType.SUPERLIKE]:
-            # Bloqueamos la fila del swipe recíproco para evitar que otro proceso
-            # intente crear un match al mismo tiempo (Race condition)
-            is_reciprocal = (
-                Swipe.objects.select_for_update()
-                .filter(
-                    swiper=target,  # El que recibe ahora, fue el que dio like antes
-                    target=swiper,
-                    value__in=[Swipe.SwipeType.LIKE, Swipe.SwipeType.SUPERLIKE],
+        # 2. Lógica de Match (Solo si es Like/Superlike).
+        # Usamos el valor guardado: en un reintento es el del primer intento.
+        if swipe.value in POSITIVE_SWIPES:
+            match = create_match_if_reciprocal(swiper.id, target.id)
+            if match:
+                # Ya tenemos los dos perfiles en memoria: evitamos 2 queries luego
+                by_id = {swiper.id: swiper, target.id: target}
+                match.user_a = by_id[match.user_a_id]
+                match.user_b = by_id[match.user_b_id]
+
+        return swipe, match, created
+
+
+def create_swipes_bulk(
+    swiper: Profile, items: list[tuple[UUID, str]]
+) -> tuple[dict[UUID, UUID], set[UUID], list[Match]]:
+    """
+    Versión por lotes de create_swipe_and_check_match.
+    Número de queries constante, sea cual sea el tamaño del lote:
+    1 INSERT de swipes, 1 SELECT para leerlos, 1 lock de las parejas
+    y 1 INSERT ... SELECT de matches con los likes recíprocos.
+
+    Args:
+        swiper: Perfil que vota
+        items: Lista de (target_id, value)
+
+    Returns:
+        Tupla (swipe_id por target_id, target_ids con swipe nuevo,
+        matches nuevos)
+    """
+    target_ids = [target_id for target_id, _ in items]
+    # El id se genera en Python: si el guardado coincide, lo hemos creado nosotros
+    new_swipes = [
+        Swipe(swiper=swiper, target_id=target_id, value=value)
+        for target_id, value in items
+    ]
+    new_swipe_ids = {swipe.id for swipe in new_swipes}
+
+    with transaction.atomic():
+        # 1. Un único INSERT ... ON CONFLICT DO NOTHING.
+        # Si ya había votado a alguien, se conserva el voto original.
+        Swipe.objects.bulk_create(new_swipes, ignore_conflicts=True)
+
+        # 2. Leemos los swipes reales (los nuevos y los que ya existían)
+        stored = Swipe.objects.filter(
+            swiper=swiper, target_id__in=target_ids
+        ).values_list("target_id", "id", "value")
+        swipe_ids = {}
+        created_ids = set()
+        liked_ids = []
+        for target_id, swipe_id, value in stored:
+            swipe_ids[target_id] = swipe_id
+            if swipe_id in new_swipe_ids:
+                created_ids.add(target_id)
+            if value in POSITIVE_SWIPES:
+                liked_ids.append(target_id)
+
+        matches: list[Match] = []
+        if liked_ids:
+            # 3. Lock de todas las parejas y, en una sola sentencia, un Match
+            # por cada like recíproco. Solo se devuelven los recién creados.
+            _lock_pairs([_ordered_pair(swiper.id, other_id) for other_id in liked_ids])
+            created = [
+                match
+                for match in _insert_matches_if_reciprocal(swiper.id, liked_ids)
+                if match.inserted
+            ]
+
+            if created:
+                matches = list(
+                    Match.objects.filter(id__in=[match.id for match in created])
+                    .select_related("user_a__custom_user", "user_b__custom_user")
+                    .prefetch_related("user_a__photos", "user_b__photos")
                 )
-                .exists()
-            )
-
-            if is_reciprocal:
-                # Verificamos si ya existe un match por si acaso
-                # Ordenamos user_a y user_b por ID para mantener consistencia en la BD
-                # Aunque se revise esto en el model, es convenient tambien revisarlo aqui
-                user_a, user_b = sorted([swiper, target], key=lambda x: x.id)
-                # En caso de que dos usuarios hagan match a la vez.
-                match, _ = Match.objects.get_or_create(user_a=user_a, user_b=user_b)
-
-        return swipe, match
+
+        discard_from_deck(swiper.id, target_ids)
+
+    return swipe_ids, created_ids, matches
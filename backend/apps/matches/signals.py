@@ -2,7 +2,46 @@ from django.db import transaction
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import Block, Match, Swipe
+from apps.users.services import discard_from_deck
+
+from .models import Block, Match, MatchParticipant, Swipe
+
+
+@receiver(post_save, sender=Match)
+def create_participants_on_match(sender, instance: Match, created: bool, **kwargs):
+    """
+    Da de alta las dos filas de MatchParticipant (una por cada lado).
+    Los Match creados con SQL directo las insertan en la misma sentencia;
+    al borrar el Match se eliminan en cascada.
+    En un Match existente, copia is_active a sus dos filas.
+    """
+    if not created:
+        MatchParticipant.objects.filter(match=instance).exclude(
+            is_active=instance.is_active
+        ).update(is_active=instance.is_active)
+        return
+
+    MatchParticipant.objects.bulk_create(
+        [
+            MatchParticipant(
+                match=instance,
+                profile_id=instance.user_a_id,
+                other_profile_id=instance.user_b_id,
+                created_at=instance.created_at,
+                last_activity_at=instance.created_at,
+                is_active=instance.is_active,
+            ),
+            MatchParticipant(
+                match=instance,
+                profile_id=instance.user_b_id,
+                other_profile_id=instance.user_a_id,
+                created_at=instance.created_at,
+                last_activity_at=instance.created_at,
+                is_active=instance.is_active,
+            ),
+        ],
+        ignore_conflicts=True,
+    )
 
 
 @receiver(pre_delete, sender=Match)
@@ -41,3 +80,7 @@ def delete_match_on_block(sender, instance: Block, created: bool, **kwargs):
             Match.objects.filter(
                 user_a__in=[blocker, blocked], user_b__in=[blocker, blocked]
             ).delete()
+
+            # Y que no vuelvan a verse en el feed (en ningún sentido)
+            discard_from_deck(blocker.id, [blocked.id])
+            discard_from_deck(blocked.id, [blocker.id])
@@ -1 +1,132 @@
-# Create your tests here.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from apps.users.models import CustomUser, Profile
+
+from .models import Match, MatchParticipant, Swipe
+from .services.match_service import create_swipe_and_check_match, create_swipes_bulk
+
+LIKE = Swipe.SwipeType.LIKE
+
+
+def make_profiles(count, prefix):
+    users = CustomUser.objects.bulk_create(
+        CustomUser(email=f"{prefix}{i}@example.com") for i in range(count)
+    )
+    return Profile.objects.bulk_create(
+        Profile(
+            custom_user=user,
+            first_name=prefix,
+            birth_date=date(1995, 6, 15),
+            gender=Profile.Gender.FEMALE,
+        )
+        for user in users
+    )
+
+
+class ReciprocalMatchInsertTests(TestCase):
+    """
+    El match se da de alta con SQL a mano (un CTE que inserta Match y las
+    dos filas de MatchParticipant): un campo nuevo en cualquiera de los
+    dos modelos tiene que entrar también en ese INSERT.
+    """
+
+    def assert_one_match(self, first, second):
+        match = Match.objects.get()
+        self.assertEqual(
+            set(
+                MatchParticipant.objects.filter(match=match).values_list(
+                    "profile_id", "other_profile_id", "unread_count", "is_active"
+                )
+            ),
+            {(first.id, second.id, 0, True), (second.id, first.id, 0, True)},
+        )
+        return match
+
+    def test_reciprocal_like_creates_match_and_participants(self):
+        first, second = make_profiles(2, "single")
+
+        _, no_match, _ = create_swipe_and_check_match(first, second, LIKE)
+        _, match, _ = create_swipe_and_check_match(second, first, LIKE)
+
+        self.assertIsNone(no_match)
+        self.assertEqual(match, self.assert_one_match(first, second))
+
+    def test_reciprocal_like_in_bulk_creates_match_and_participants(self):
+        first, second = make_profiles(2, "bulk")
+        create_swipe_and_check_match(first, second, LIKE)
+
+        _, _, matches = create_swipes_bulk(second, [(first.id, LIKE)])
+
+        self.assertEqual(matches, [self.assert_one_match(first, second)])
+
+
+class ConcurrentSwipeTests(TransactionTestCase):
+    """
+    Likes simultáneos contra el camino de match con lock por pareja.
+    TransactionTestCase: cada hilo usa su propia conexión y tiene que ver
+    los datos confirmados (un TestCase normal los deja en su transacción).
+    """
+
+    workers = 20
+
+    def run_concurrently(self, calls):
+        """Lanza las llamadas a la vez y propaga cualquier error de los hilos."""
+        start = threading.Event()
+
+        def run(call):
+            try:
+                start.wait()
+                return call()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(run, call) for call in calls]
+            start.set()
+            return [future.result() for future in futures]
+
+    def test_reciprocal_likes_at_once_create_one_match(self):
+        first, second = make_profiles(2, "pair")
+
+        self.run_concurrently(
+            [
+                lambda: create_swipe_and_check_match(first, second, LIKE),
+                lambda: create_swipe_and_check_match(second, first, LIKE),
+            ]
+        )
+
+        self.assertEqual(Match.objects.count(), 1)
+        match = Match.objects.get()
+        self.assertEqual(
+            set(
+                MatchParticipant.objects.filter(match=match).values_list(
+                    "profile_id", "other_profile_id"
+                )
+            ),
+            {(first.id, second.id), (second.id, first.id)},
+        )
+
+    def test_burst_of_likes_on_one_target(self):
+        # El objetivo ya ha dado like a todos: cada like de vuelta es un match
+        target = make_profiles(1, "target")[0]
+        likers = make_profiles(200, "liker")
+        Swipe.objects.bulk_create(
+            Swipe(swiper=target, target=liker, value=LIKE) for liker in likers
+        )
+
+        results = self.run_concurrently(
+            [
+                lambda liker=liker: create_swipe_and_check_match(liker, target, LIKE)
+                for liker in likers
+            ]
+        )
+
+        # Sin deadlocks (el error saldría de future.result()) ni duplicados
+        self.assertTrue(all(match is not None for _, match, _ in results))
+        self.assertEqual(Match.objects.count(), len(likers))
+        self.assertEqual(MatchParticipant.objects.count(), 2 * len(likers))
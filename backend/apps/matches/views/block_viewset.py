@@ -23,5 +23,4 @@ class BlockViewSet(
 
     def get_queryset(self) -> Any:
         user: Any = self.request.user
-        profile = user.profile
-        return Block.objects.filter(blocker=profile)
+        return Block.objects.filter(blocker_id=user.profile_id)
@@ -1,12 +1,11 @@
 from typing import Any
 
 from django.contrib.gis.db.models.functions import Distance
-from django.db.models import Case, F, Q, When
 from rest_framework import mixins, viewsets
 from rest_framework.permissions import IsAuthenticated
 
-from apps.matches.models import Match
-from apps.matches.serializers import MatchSerializer
+from apps.matches.models import MatchParticipant
+from apps.matches.serializers import MatchParticipantSerializer
 from apps.users.permissions import HasProfile
 
 
@@ -14,41 +13,42 @@ class MatchViewSet(viewsets.ReadOnlyModelViewSet, mixins.DestroyModelMixin):
     """
     ViewSet de solo lectura y eliminación para los Matches.
     Permite listar y obtener detalles de los matches del usuario autenticado.
+
+    Lee desde MatchParticipant: la URL sigue usando el ID del Match.
     """
 
-    serializer_class = MatchSerializer
+    serializer_class = MatchParticipantSerializer
     permission_classes = [IsAuthenticated, HasProfile]
+    lookup_field = "match_id"
+    lookup_url_kwarg = "pk"
 
     def get_queryset(self):
         """
-        Retorna los matches del usuario autenticado, ya sea que figure
-        como user_a o user_b.
+        Retorna los matches del usuario autenticado.
+        Un único range scan sobre el índice parcial (profile, -created_at)
+        de los activos, sin el OR entre user_a y user_b ni JOIN con Match.
         """
 
         user: Any = self.request.user
         profile = user.profile
 
         qs = (
-            Match.objects.filter(Q(user_a=profile) | Q(user_b=profile), is_active=True)
-            .select_related("user_a__custom_user", "user_b__custom_user")
+            MatchParticipant.objects.filter(profile=profile, is_active=True)
+            .select_related("other_profile__custom_user")
+            .prefetch_related("other_profile__photos")
             .order_by("-created_at")
         )
         # 2. Lógica Geoespacial :
         # Si el usuario tiene ubicación, calculamos la distancia en la DB.
+        # El "otro" ya está resuelto en la fila: no hace falta un CASE.
+        # Solo se muestra: ordenar por ella obligaría a ordenar todas las filas.
         if profile.location:
-            qs = (
-                qs.annotate(
-                    # Determinamos dinámicamente la ubicación del "otro"
-                    other_location=Case(
-                        When(user_a=profile, then=F("user_b__location")),
-                        default=F("user_a__location"),
-                    )
-                )
-                .annotate(
-                    # Calculamos distancia entre MI ubicación y la del "otro"
-                    distance_val=Distance("other_location", profile.location)
-                )
-                .order_by("distance_val", "-created_at")
-            )  # Opcional: ordenar por cercanía
+            qs = qs.annotate(
+                distance_val=Distance("other_profile__location", profile.location)
+            )
 
         return qs
+
+    def perform_destroy(self, instance: MatchParticipant):
+        # Se borra el Match; sus dos filas de participante caen en cascada
+        instance.match.delete()
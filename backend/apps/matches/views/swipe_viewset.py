@@ -1,11 +1,15 @@
+from uuid import UUID
+
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from apps.users.permissions import HasProfile
 
-from ..serializers import MatchSerializer, SwipeSerializer
-from ..services.match_service import create_swipe_and_check_match
+from ..serializers import BulkSwipeSerializer, MatchSerializer, SwipeSerializer
+from ..services.match_service import create_swipe_and_check_match, create_swipes_bulk
 
 
 class SwipeViewSet(viewsets.GenericViewSet):
@@ -17,19 +21,38 @@ class SwipeViewSet(viewsets.GenericViewSet):
     serializer_class = SwipeSerializer
     permission_classes = [IsAuthenticated, HasProfile]
 
+    def get_serializer_class(self):
+        if self.action == "bulk":
+            return BulkSwipeSerializer
+        return SwipeSerializer
+
     def create(self, request, *args, **kwargs):
         # 1. Validar datos de entrada (Input)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        idempotency_key = self.get_idempotency_key(request)
 
         # 2. Llamar a la Capa de Servicio (Lógica de Negocio)
         # El serializer nos da los datos limpios (validated_data)
         target_profile = serializer.validated_data["target"]
         value = serializer.validated_data["value"]
 
-        swipe, match = create_swipe_and_check_match(
-            swiper=request.user.profile, target=target_profile, value=value
+        swipe, match, created = create_swipe_and_check_match(
+            swiper=request.user.profile,
+            target=target_profile,
+            value=value,
+            idempotency_key=idempotency_key,
+        )
+
+        # Ya existía: si es el mismo intento (misma clave) respondemos igual que
+        # la primera vez; si no, es un voto repetido.
+        is_replay = idempotency_key is not None and (
+            swipe.idempotency_key == idempotency_key
         )
+        if not created and not is_replay:
+            raise ValidationError(
+                {"non_field_errors": ["Ya has votado a este usuario anteriormente."]}
+            )
 
         # 3. Preparar respuesta (Output)
         response_data = {"match": match is not None, "swipe_id": swipe.id}
@@ -39,4 +62,60 @@ class SwipeViewSet(viewsets.GenericViewSet):
             match_serializer = MatchSerializer(match, context={"request": request})
             response_data["match_details"] = match_serializer.data
 
-        return Response(response_data, status=status.HTTP_201_CREATED)
+        return Response(
+            response_data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def get_idempotency_key(request) -> UUID | None:
+        """
+        Cabecera opcional 'Idempotency-Key' (UUID generado por el cliente).
+        Los reintentos con la misma clave devuelven el resultado original.
+        """
+        raw_key = request.headers.get("Idempotency-Key")
+        if not raw_key:
+            return None
+        try:
+            return UUID(raw_key)
+        except ValueError:
+            raise ValidationError(
+                {"Idempotency-Key": ["Debe ser un UUID válido."]}
+            ) from None
+
+    # URL: POST /api/social/swipes/bulk/
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Crea varios swipes en una sola petición (ráfagas del cliente móvil).
+        Body: {"swipes": [{"target": "<uuid>", "value": "LIKE"}, ...]}
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        items = [
+            (item["target"], item["value"])
+            for item in serializer.validated_data["swipes"]
+        ]
+        swipe_ids, created_ids, matches = create_swipes_bulk(
+            swiper=request.user.profile, items=items
+        )
+
+        response_data = {
+            "results": [
+                {
+                    "target": target_id,
+                    "swipe_id": swipe_ids.get(target_id),
+                    "created": target_id in created_ids,
+                }
+                for target_id, _ in items
+            ],
+            "matches": MatchSerializer(
+                matches, many=True, context={"request": request}
+            ).data,
+        }
+        # Igual que create: 201 si se ha creado algo, 200 si todo ya existía
+        return Response(
+            response_data,
+            status=status.HTTP_201_CREATED if created_ids else status.HTTP_200_OK,
+        )
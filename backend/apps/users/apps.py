@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = "apps.users"
+
+    def ready(self):
+        # Importamos los signals para que se registren
+        import apps.users.signals  # noqa: F401
@@ -0,0 +1,84 @@
+from functools import cached_property
+from uuid import UUID
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Profile
+
+PROFILE_ID_CLAIM = "profile_id"
+
+
+class ProfileRefreshToken(RefreshToken):
+    """
+    Refresh token que lleva el ID del perfil como claim.
+    El access token derivado (y los de cada refresh) lo heredan.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        profile_id = (
+            Profile.objects.filter(custom_user=user)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if profile_id is not None:
+            token[PROFILE_ID_CLAIM] = str(profile_id)
+        return token
+
+
+class ProfileTokenUser(TokenUser):
+    """
+    Usuario "ligero" construido solo con el token: sin query a CustomUser.
+
+    - `profile_id` sale del claim (tokens antiguos sin claim: una query mínima).
+    - `profile` se carga una sola vez, y solo si la vista lo pide.
+    """
+
+    @cached_property
+    def profile_id(self) -> UUID | None:
+        claim = self.token.get(PROFILE_ID_CLAIM)
+        if claim:
+            return UUID(claim)
+        return (
+            Profile.objects.filter(custom_user_id=self.id)
+            .values_list("id", flat=True)
+            .first()
+        )
+
+    @cached_property
+    def profile(self) -> Profile:
+        if self.profile_id is None:
+            raise Profile.DoesNotExist("No existe un perfil para este usuario.")
+        return Profile.objects.select_related("custom_user").get(id=self.profile_id)
+
+    def __eq__(self, other: object) -> bool:
+        # Permite comparar con instancias de CustomUser (p. ej. obj.owner == request.user)
+        if isinstance(other, TokenUser):
+            return self.id == other.id
+        other_pk = getattr(other, "pk", None)
+        if other_pk is None:
+            return NotImplemented
+        return str(self.id) == str(other_pk)
+
+    def __hash__(self) -> int:
+        return hash(str(self.id))
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    Autenticación JWT sin estado: valida la firma y devuelve un
+    ProfileTokenUser en lugar de cargar el CustomUser de la BD.
+
+    Como en JWTStatelessUserAuthentication, un usuario desactivado conserva
+    el acceso hasta que caduca su access token (ACCESS_TOKEN_LIFETIME).
+    """
+
+    def get_user(self, validated_token) -> ProfileTokenUser:
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return ProfileTokenUser(validated_token)
@@ -0,0 +1,173 @@
+"""
+Procesado de imágenes con Pillow, sin nada de Django.
+
+Se ejecuta en los procesos del pool de fotos (services.photo_service):
+trabaja con bytes de entrada y salida para que los argumentos y el
+resultado se puedan enviar entre procesos.
+"""
+
+import math
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import BinaryIO
+
+from PIL import Image, ImageOps
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    name: str
+    format: str
+    extension: str
+    quality: int
+
+
+WEBP = OutputFormat(name="webp", format="WEBP", extension=".webp", quality=80)
+JPEG = OutputFormat(name="jpeg", format="JPEG", extension=".jpg", quality=85)
+
+
+@dataclass(frozen=True)
+class ImageConfig:
+    # Variante -> lado máximo en px. "full" es la que va al campo 'image'
+    variants: dict[str, int] = field(
+        default_factory=lambda: {"thumb": 160, "card": 480, "full": 1080}
+    )
+    # WebP primero; JPEG como alternativa para clientes sin soporte
+    formats: tuple[OutputFormat, ...] = (WEBP, JPEG)
+    primary_variant: str = "full"
+    primary_format: OutputFormat = JPEG
+    # Límite de píxeles (ancho x alto), comprobado solo con la cabecera
+    max_pixels: int = 40_000_000
+    allowed_formats: frozenset[str] = frozenset(
+        {"JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF"}
+    )
+
+    @property
+    def extension(self) -> str:
+        return self.primary_format.extension
+
+
+IMAGE_SETTINGS = ImageConfig()
+
+
+class InvalidImageError(ValueError):
+    """La imagen no se acepta: cabecera ilegible, formato o dimensiones."""
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    format: str
+    width: int
+    height: int
+
+
+# {"thumb": {"width": 160, "height": 120, "webp": b"...", "jpeg": b"..."}, ...}
+RenderedVariants = dict[str, dict[str, int | bytes]]
+
+
+def _check_header(img: Image.Image, config: ImageConfig) -> ImageHeader:
+    header = ImageHeader(format=img.format or "", width=img.width, height=img.height)
+    if header.format not in config.allowed_formats:
+        raise InvalidImageError("Formato de imagen no soportado.")
+    if header.width * header.height > config.max_pixels:
+        raise InvalidImageError("La imagen tiene demasiados píxeles.")
+    return header
+
+
+def read_header(fp: BinaryIO, config: ImageConfig = IMAGE_SETTINGS) -> ImageHeader:
+    """
+    Valida formato y dimensiones leyendo solo la cabecera: Image.open no
+    decodifica píxeles, así una imagen enorme se rechaza sin cargarla.
+    Deja el archivo en la posición en la que estaba.
+    """
+    position = fp.tell()
+    try:
+        with Image.open(fp) as img:
+            return _check_header(img, config)
+    except Image.DecompressionBombError as exc:
+        raise InvalidImageError("La imagen tiene demasiados píxeles.") from exc
+    except (OSError, SyntaxError) as exc:
+        raise InvalidImageError("El archivo no es una imagen válida.") from exc
+    finally:
+        fp.seek(position)
+
+
+def decode_image(data: bytes, config: ImageConfig = IMAGE_SETTINGS) -> Image.Image:
+    """
+    Decodifica una sola vez, ya a la escala de la variante más grande,
+    corrige la rotación y deja la imagen en RGB.
+    """
+    img = Image.open(BytesIO(data))
+    _check_header(img, config)
+
+    # Caja con la proporción de la imagen cuyo lado mayor es la variante
+    # más grande: por debajo de eso no hace falta ningún píxel.
+    target = max(config.variants.values())
+    scale = target / max(img.size)
+    if scale < 1:
+        box = (math.ceil(img.width * scale), math.ceil(img.height * scale))
+        if img.format == "JPEG":
+            # JPEG: el decoder escala directamente a 1/2, 1/4 o 1/8
+            img.draft("RGB", box)
+        elif img.mode in ("RGB", "RGBA", "L", "LA"):
+            # Resto: reducción entera (barata) antes de cualquier otra operación
+            factor = max(min(img.width // box[0], img.height // box[1]), 1)
+            img = img.reduce(factor)
+
+    # 1. Corregir orientación EXIF (común en fotos de móvil)
+    try:
+        # exif_transpose devuelve una copia si la rota, o la misma img si no
+        fixed_img = ImageOps.exif_transpose(img)
+        if fixed_img is not img:
+            img = fixed_img
+    except Exception:
+        # Si los datos EXIF están corruptos, ignoramos el error y
+        # seguimos con la imagen original para no bloquear la subida.
+        pass
+
+    # 2. Convertir a RGB (Standard para web/jpg)
+    if img.mode != "RGB":
+        # Si es PNG con transparencia (RGBA), poner fondo blanco
+        if img.mode in ("RGBA", "LA"):
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        else:
+            img = img.convert("RGB")
+    return img
+
+
+def encode_image(img: Image.Image, output: OutputFormat) -> bytes:
+    output_io = BytesIO()
+    if output.format == "JPEG":
+        img.save(output_io, format="JPEG", quality=output.quality, optimize=True)
+    else:
+        img.save(output_io, format=output.format, quality=output.quality, method=4)
+    return output_io.getvalue()
+
+
+def render_variants(
+    data: bytes, config: ImageConfig = IMAGE_SETTINGS
+) -> RenderedVariants:
+    """
+    Genera todas las variantes (tamaños x formatos) con una sola
+    decodificación. Se redimensiona de mayor a menor partiendo de la
+    variante anterior, así cada LANCZOS trabaja con menos píxeles.
+    """
+    img = decode_image(data, config)
+
+    rendered: RenderedVariants = {}
+    for name, max_dimension in sorted(
+        config.variants.items(), key=lambda item: item[1], reverse=True
+    ):
+        # 3. Redimensionar (solo si es más grande que la variante)
+        if img.height > max_dimension or img.width > max_dimension:
+            img = img.copy()
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+        # 4. Codificar en cada formato
+        variant: dict[str, int | bytes] = {"width": img.width, "height": img.height}
+        for output in config.formats:
+            variant[output.name] = encode_image(img, output)
+        rendered[name] = variant
+    return rendered
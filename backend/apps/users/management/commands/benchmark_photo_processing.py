@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from apps.users.imaging import render_variants
+from apps.users.services.photo_service import _config, _job_executor, _render
+
+
+def sample_upload(width: int, height: int) -> bytes:
+    """JPEG de móvil sintético: ruido, que comprime tan mal como una foto."""
+    bands = [Image.effect_noise((width, height), sigma) for sigma in (40, 60, 80)]
+    output = BytesIO()
+    Image.merge("RGB", bands).save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide fotos/segundo procesando subidas concurrentes en línea "
+        "(como antes, en el hilo de la petición) y con el pool de procesos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uploads", type=int, default=24)
+        parser.add_argument("--width", type=int, default=4000)
+        parser.add_argument("--height", type=int, default=3000)
+
+    def handle(self, *args, **options):
+        uploads = options["uploads"]
+        data = sample_upload(options["width"], options["height"])
+        self.stdout.write(
+            f"{uploads} subidas de {options['width']}x{options['height']} "
+            f"({len(data) // 1024} KB), MAX_WORKERS={_config()['MAX_WORKERS']}"
+        )
+
+        # Calienta el pool (arrancar el forkserver no cuenta)
+        _render(data)
+
+        # Antes: cada petición procesaba su foto en su propio hilo (GIL)
+        with ThreadPoolExecutor(max_workers=uploads) as request_threads:
+            inline = self.measure(request_threads, render_variants, data, uploads)
+        # Ahora: los hilos de jobs esperan y el CPU va al pool de procesos
+        pooled = self.measure(_job_executor, _render, data, uploads)
+
+        self.stdout.write(f"En línea:          {inline:6.2f} fotos/s")
+        self.stdout.write(f"Pool de procesos:  {pooled:6.2f} fotos/s")
+        self.stdout.write(self.style.SUCCESS(f"x{pooled / inline:.2f}"))
+
+    @staticmethod
+    def measure(executor, render, data: bytes, uploads: int) -> float:
+        started = time.perf_counter()
+        futures = [executor.submit(render, data) for _ in range(uploads)]
+        for future in futures:
+            future.result()
+        return uploads / (time.perf_counter() - started)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.services import requeue_unprocessed_photos
+
+
+class Command(BaseCommand):
+    help = "Reencola las fotos pendientes de procesar (p. ej. tras un reinicio)."
+
+    def handle(self, *args, **options):
+        count = requeue_unprocessed_photos()
+        # El proceso espera a que terminen los jobs encolados antes de salir
+        self.stdout.write(self.style.SUCCESS(f"{count} fotos reencoladas."))
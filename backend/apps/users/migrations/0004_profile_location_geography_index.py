@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:48
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_profile_gender_preference_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=django.contrib.postgres.indexes.GistIndex(django.db.models.functions.comparison.Cast('location', output_field=django.contrib.gis.db.models.fields.PointField(geography=True, srid=4326)), name='profile_location_geog_gist'),
+        ),
+    ]
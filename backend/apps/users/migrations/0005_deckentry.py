@@ -0,0 +1,26 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_profile_location_geography_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeckEntry',
+            fields=[
+                ('pk', models.CompositePrimaryKey('owner_id', 'candidate_id', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('position', models.PositiveIntegerField()),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='in_decks', to='users.profile')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deck_entries', to='users.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'position'], name='deck_owner_position_idx')],
+            },
+        ),
+    ]
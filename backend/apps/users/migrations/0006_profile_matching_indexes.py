@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_deckentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['gender', 'gender_preference', 'birth_date'], name='profile_match_prefs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('location__isnull', False)), fields=['gender_preference', 'birth_date'], include=('max_distance', 'min_age', 'max_age'), name='profile_located_prefs_idx'),
+        ),
+    ]
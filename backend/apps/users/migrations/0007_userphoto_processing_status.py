@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_profile_matching_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userphoto',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        # Las fotos existentes ya se procesaron al subirlas: entran como 'ready'
+        migrations.AddField(
+            model_name='userphoto',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente de procesar'), ('processing', 'Procesando'), ('ready', 'Lista'), ('failed', 'Error al procesar')], default='ready', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='userphoto',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente de procesar'), ('processing', 'Procesando'), ('ready', 'Lista'), ('failed', 'Error al procesar')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='userphoto',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['created'], name='photo_unprocessed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_userphoto_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.1.2 on 2026-10-18 14:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def keep_one_main_photo(apps, schema_editor):
+    """Antes del índice único: si un perfil tiene varias principales, se queda la más reciente."""
+    UserPhoto = apps.get_model("users", "UserPhoto")
+    newer_main = UserPhoto.objects.filter(
+        profile_id=OuterRef("profile_id"), is_main=True, created__gt=OuterRef("created")
+    )
+    UserPhoto.objects.filter(is_main=True).filter(Exists(newer_main)).update(is_main=False)
+
+
+def backfill_main_photo(apps, schema_editor):
+    Profile = apps.get_model("users", "Profile")
+    UserPhoto = apps.get_model("users", "UserPhoto")
+    main = UserPhoto.objects.filter(profile_id=OuterRef("pk"), is_main=True).values("pk")[:1]
+    Profile.objects.update(main_photo=Subquery(main))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_photoblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='main_photo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='users.userphoto'),
+        ),
+        migrations.RunPython(keep_one_main_photo, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userphoto',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_main', True)), fields=('profile',), name='photo_one_main_per_profile'),
+        ),
+        migrations.RunPython(backfill_main_photo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Case, Exists, OuterRef, Subquery, Value, When
+
+
+def backfill_fallback_main_photo(apps, schema_editor):
+    """
+    Perfiles sin foto principal (la borraron o nunca marcaron una): se
+    promueve la más reciente ya procesada, como hace ensure_main_photo.
+    """
+    Profile = apps.get_model("users", "Profile")
+    UserPhoto = apps.get_model("users", "UserPhoto")
+    fallback = (
+        UserPhoto.objects.filter(profile_id=OuterRef("pk"))
+        .exclude(status="failed")
+        .order_by(
+            Case(When(status="ready", then=Value(0)), default=Value(1)), "-created"
+        )
+        .values("pk")[:1]
+    )
+    Profile.objects.filter(main_photo__isnull=True).update(main_photo=Subquery(fallback))
+    is_profile_main = Profile.objects.filter(main_photo=OuterRef("pk"))
+    UserPhoto.objects.filter(Exists(is_profile_main), is_main=False).update(is_main=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_profile_main_photo'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_fallback_main_photo, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,13 @@
-from .photos import UserPhoto
+from .deck import DeckEntry
+from .photos import PhotoBlob, UserPhoto
 from .profiles import Profile, ProfileQuerySet
 from .users import CustomUser
 
-__all__ = ["CustomUser", "Profile", "ProfileQuerySet", "UserPhoto"]
+__all__ = [
+    "CustomUser",
+    "DeckEntry",
+    "PhotoBlob",
+    "Profile",
+    "ProfileQuerySet",
+    "UserPhoto",
+]
@@ -0,0 +1,33 @@
+from django.db import models
+
+from .profiles import Profile
+
+
+class DeckEntry(models.Model):
+    """
+    "Mazo" precalculado de candidatos del feed de un perfil.
+
+    Es una cola ordenada de IDs (owner, candidate, position): el feed lee
+    una página por el índice (owner, position) sin volver a ejecutar la
+    query geoespacial completa. Los swipes sacan al candidato del mazo.
+    """
+
+    # Clave primaria compuesta: la fila es solo la pareja + su posición
+    pk = models.CompositePrimaryKey("owner_id", "candidate_id")
+    owner = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="deck_entries"
+    )
+    candidate = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="in_decks"
+    )
+    position = models.PositiveIntegerField()
+
+    objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "position"], name="deck_owner_position_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Deck {self.owner_id} #{self.position} -> {self.candidate_id}"
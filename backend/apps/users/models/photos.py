@@ -1,36 +1,63 @@
 import os
 import uuid
-from dataclasses import dataclass
-from io import BytesIO
 
-from django.core.files.base import ContentFile
 from django.db import models, transaction
-from PIL import Image
+from django.utils.translation import gettext_lazy as _
+from django_cleanup import cleanup
 
+from ..imaging import IMAGE_SETTINGS
 from .profiles import Profile
 
-
-@dataclass(frozen=True)
-class ImageConfig:
-    format: str = "JPEG"
-    extension: str = ".jpg"
-    quality: int = 85
-    max_dimension: int = 480
-
-
-IMAGE_SETTINGS = ImageConfig()
+# Extensiones que conservamos para el original (el resto se guarda como .jpg)
+RAW_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tiff"}
 
 
 def get_file_path(instance, filename: str) -> str:
     """
     Generar nombres únicos: "user_id/photos/uuid-generado.jpg"
-    Cambiando el nombre de la extension siempre a jpg
+    El original se guarda con su extensión hasta que se procesa;
+    la versión procesada siempre es jpg.
     """
-    filename = f"{uuid.uuid4()}{IMAGE_SETTINGS.extension}"
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in RAW_EXTENSIONS:
+        extension = IMAGE_SETTINGS.extension
+    filename = f"{uuid.uuid4()}{extension}"
     return os.path.join(f"user_{instance.profile.id}", "photos", filename)
 
 
+class PhotoBlob(models.Model):
+    """
+    Foto procesada guardada por contenido: la clave es el SHA-256 del
+    archivo subido. Si alguien vuelve a subir la misma imagen (en la misma
+    cuenta o en otra), se reutiliza el blob sin guardar ni procesar nada.
+
+    'refcount' cuenta las UserPhoto que lo usan; sus archivos se borran
+    cuando llega a cero (services.photo_service.release_blob).
+    """
+
+    digest = models.CharField(primary_key=True, max_length=64)
+    # Rutas en el storage: variante principal y {"thumb": {...}, ...}
+    image = models.CharField(max_length=255)
+    variants = models.JSONField(default=dict)
+    refcount = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = models.Manager()
+
+    def __str__(self) -> str:
+        return f"PhotoBlob ({self.digest[:12]}) x{self.refcount}"
+
+
+# Los archivos son de PhotoBlob (compartidos): django_cleanup no debe
+# borrarlos al borrar o cambiar una foto. Lo gestiona photo_service.
+@cleanup.ignore
 class UserPhoto(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pendiente de procesar")
+        PROCESSING = "processing", _("Procesando")
+        READY = "ready", _("Lista")
+        FAILED = "failed", _("Error al procesar")
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     profile = models.ForeignKey(
         Profile,
@@ -45,94 +72,102 @@ class UserPhoto(models.Model):
     is_main = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True)
 
+    # Procesado en segundo plano (services.photo_service)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # {"thumb": {"width": .., "height": .., "webp": ruta, "jpeg": ruta}, "card": ..}
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Contenido compartido; null mientras la foto está sin procesar
+    blob = models.ForeignKey(
+        PhotoBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="photos",
+    )
+
     objects = models.Manager()
 
     class Meta:
         ordering = ["-is_main", "-created"]  # La principal primero, luego las nuevas
+        indexes = [
+            # Solo las pendientes: para reencolarlas tras un reinicio
+            models.Index(
+                fields=["created"],
+                name="photo_unprocessed_idx",
+                condition=models.Q(status__in=["pending", "processing"]),
+            ),
+        ]
+        constraints = [
+            # Como mucho una foto principal por perfil
+            models.UniqueConstraint(
+                fields=["profile"],
+                condition=models.Q(is_main=True),
+                name="photo_one_main_per_profile",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Photo ({self.id}) - {self.profile.first_name}"
 
     def save(self, *args, **kwargs):
         """
-        Sobreescribimos save para asegurar integridad en 'is_main'
-        y procesar la imagen automáticamente.
+        Sobreescribimos save para asegurar integridad en 'is_main' y
+        mantener Profile.main_photo. Si el perfil se queda sin principal
+        (o es su primera foto), se promueve otra (photo_service.ensure_main_photo).
+
+        Una imagen nueva cuyo contenido ya existe reutiliza su PhotoBlob
+        (ni se sube ni se procesa). Si no, se guarda tal cual y se procesa
+        después del commit, fuera de la petición (services.photo_service).
         """
+        from ..services import photo_service
+
+        # Solo procesar si la imagen es nueva o ha cambiado (no está committeada al storage)
+        is_new_image = bool(self.image) and not getattr(self.image, "_committed", False)
+        previous = None
+        if is_new_image and not self._state.adding:
+            previous = UserPhoto.objects.filter(pk=self.pk).first()
 
+        unmarked = False
         with transaction.atomic():
-            # Lógica extra: Si marco esta como main, desmarcar las otras
             if self.is_main:
-                UserPhoto.objects.filter(profile=self.profile).update(is_main=False)
-
-            # Solo procesar si la imagen es nueva o ha cambiado (no está committeada al storage)
-            if self.image and not getattr(self.image, "_committed", False):
-                self.process_image()
+                # Primero el perfil: bloquea su fila y serializa dos cambios
+                # de principal a la vez (la FK se comprueba en el commit)
+                Profile.objects.filter(pk=self.profile_id).update(main_photo=self.pk)
+                # Desmarcar la anterior: una fila como mucho (índice parcial)
+                UserPhoto.objects.filter(
+                    profile_id=self.profile_id, is_main=True
+                ).exclude(pk=self.pk).update(is_main=False)
+            elif not self._state.adding:
+                # Si era la principal y se desmarca, el perfil se queda sin ella
+                unmarked = Profile.objects.filter(
+                    pk=self.profile_id, main_photo=self.pk
+                ).update(main_photo=None)
+
+            if is_new_image:
+                self.blob = None
+                self.variants = {}
+                self.status = self.Status.PENDING
+                self.attempts = 0
+                photo_service.attach_existing_blob(self)
 
             super().save(*args, **kwargs)
 
-    def process_image(self):
-        """
-        Normaliza la imagen: Corrige rotación, convierte a RGB,
-        redimensiona y comprime a JPEG.
-        """
-        if not self.image:
-            return
-
-        img = Image.open(self.image)
-
-        # Corregir orientación EXIF (común en fotos de móvil)
-        try:
-            from PIL import ImageOps
-
-            # exif_transpose devuelve una copia si la rota, o la misma img si no
-            fixed_img = ImageOps.exif_transpose(img)
-            if fixed_img is not img:
-                img = fixed_img
-        except Exception:
-            # Si los datos EXIF están corruptos, ignoramos el error y
-            # seguimos con la imagen original para no bloquear la subida.
-            pass
-
-        # 2. Convertir a RGB (Standard para web/jpg)
-        if img.mode != "RGB":
-            # Si es PNG con transparencia (RGBA), poner fondo blanco
-            if img.mode in ("RGBA", "LA"):
-                background = Image.new("RGB", img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1])
-                img = background
-            else:
-                img = img.convert("RGB")
-
-        # 3. Redimensionar (solo si es muy grande)
-        if (
-            img.height > IMAGE_SETTINGS.max_dimension
-            or img.width > IMAGE_SETTINGS.max_dimension
-        ):
-            output_size = (
-                IMAGE_SETTINGS.max_dimension,
-                IMAGE_SETTINGS.max_dimension,
-            )
-            img.thumbnail(output_size, Image.Resampling.LANCZOS)
-
-        # 4. Guardar archivo final
-        # Guardamos SIEMPRE para unificar formato  y calidad
-
-        # Creas el "archivo virtual" vacío en la memoria RAM
-        output_io = BytesIO()
-
-        # Pillow escribe los 0s y 1s del formato JPEG dentro de esa variable en RAM.
-        img.save(
-            output_io,
-            format=IMAGE_SETTINGS.format,
-            quality=IMAGE_SETTINGS.quality,
-            optimize=True,
-        )
-        # .getvalue() extrae todo el contenido crudo (los bytes reales) de ese archivo virtual.
-        # ContentFile coge esos bytes y los empaqueta para que Django los entienda como un archivo subido.
-        new_image = ContentFile(output_io.getvalue())
-
-        # Guardamos en el campo. save=False evita bucle infinito de save() del modelo
-        self.image.save(self.image.name, new_image, save=False)
+            if not self.is_main:
+                # La desmarcada no vuelve a salir como principal de respaldo
+                main_photo = photo_service.ensure_main_photo(
+                    self.profile_id, exclude=self.pk if unmarked else None
+                )
+                self.is_main = main_photo == self.pk
+
+            if previous is not None:
+                # La imagen anterior: un blob menos o sus propios archivos
+                photo_service.release_photo_files(previous)
+            if is_new_image and self.status == self.Status.PENDING:
+                photo_service.schedule_photo_processing(self.pk)
 
     # Estandarización: Creamos un alias 'owner'
     @property
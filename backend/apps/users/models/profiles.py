@@ -2,14 +2,26 @@ import uuid
 from datetime import date
 
 from django.contrib.gis.db import models as geomodels  # Importante para GeoDjango
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
-from django.db.models.functions import ExtractYear
+from django.db.models.functions import Cast, ExtractYear
 from django.utils.translation import gettext_lazy as _
 
 from ..utils import calculate_age
 from .users import CustomUser
 
 
+def as_geography(expression):
+    """
+    Castea un punto (SRID 4326) a geography.
+    Así PostGIS mide en metros sobre la esfera y puede usar el índice GiST
+    de la expresión (tiene que ser EXACTAMENTE la misma expresión).
+    """
+    return Cast(
+        expression, output_field=geomodels.PointField(geography=True, srid=4326)
+    )
+
+
 class ProfileQuerySet(models.QuerySet):
     """
     QuerySet personalizado para agregar métodos de consulta
@@ -101,8 +113,41 @@ class Profile(models.Model):
     min_age = models.IntegerField(default=18)
     max_age = models.IntegerField(default=99)
 
+    # Copia de la foto con is_main=True (la mantiene UserPhoto.save): las
+    # tarjetas del feed la leen con un JOIN, sin cargar todas las fotos
+    main_photo = models.ForeignKey(
+        "users.UserPhoto",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+
     objects = ProfileManager()
 
+    class Meta:
+        indexes = [
+            # Índice GiST sobre location::geography.
+            # Lo usan ST_DWithin (radio) y el operador <-> (KNN) del feed.
+            GistIndex(as_geography("location"), name="profile_location_geog_gist"),
+            # Matching en los dos sentidos: género buscado + preferencia del
+            # candidato (IN ('A', <mi género>)) + rango de fechas de nacimiento.
+            models.Index(
+                fields=["gender", "gender_preference", "birth_date"],
+                name="profile_match_prefs_idx",
+            ),
+            # Para quien busca "Todos" (sin filtro por género): solo perfiles
+            # con ubicación, que son los únicos que pueden salir en el feed.
+            # INCLUDE deja los rangos del candidato en el propio índice.
+            models.Index(
+                fields=["gender_preference", "birth_date"],
+                include=["max_distance", "min_age", "max_age"],
+                condition=models.Q(location__isnull=False),
+                name="profile_located_prefs_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.first_name} - {self.custom_user.email}"
 
@@ -0,0 +1,154 @@
+import base64
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Paginación por "keyset" (seek method) con un cursor opaco.
+
+    En vez de OFFSET, el cursor guarda los valores de las columnas de ordenación
+    de la última fila enviada y la siguiente página se pide con
+    WHERE (col1, col2) > (v1, v2). Así la página 100 cuesta lo mismo que la 1.
+
+    `ordering` debe terminar en una columna única (normalmente "id") para que
+    el orden sea total y no se repitan ni se salten filas. Un "-" delante
+    indica orden descendente.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 20
+    max_page_size = 50
+    ordering: Sequence[str] = ("id",)
+    invalid_cursor_message = "Cursor inválido."
+
+    def get_ordering(self, queryset: QuerySet, view=None) -> Sequence[str]:
+        return self.ordering
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(self.get_ordering(queryset, view))
+        self.next_cursor = None
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.build_keyset_filter(cursor))
+
+        # Pedimos una fila de más para saber si hay siguiente página sin un COUNT(*)
+        rows = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            self.next_cursor = self.encode_cursor(rows[-1])
+        return rows
+
+    def build_keyset_filter(self, values: list[Any]) -> Q:
+        """
+        Traduce (a, b, c) > (va, vb, vc) a:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+        respetando la dirección de cada columna.
+        """
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, values, strict=True):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal_prefix & Q(**{f"{name}__{lookup}": value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+    # --- Codificación del cursor ---
+
+    def encode_cursor(self, instance) -> str:
+        values = [
+            self._to_primitive(getattr(instance, field.lstrip("-")))
+            for field in self.ordering
+        ]
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request) -> list[Any] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padding = "=" * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(encoded + padding))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message) from None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _to_primitive(value: Any) -> Any:
+        # GeoDjango devuelve objetos Distance: guardamos los metros
+        if hasattr(value, "m"):
+            return value.m
+        if isinstance(value, UUID):
+            return str(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    # --- Respuesta ---
+
+    def get_next_link(self) -> str | None:
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
+
+
+class FeedCursorPagination(KeysetCursorPagination):
+    """
+    Paginación del feed de descubrimiento.
+    - Feed desde el mazo: cursor (deck_position, id), sigue el orden precalculado.
+    - Query directa: los más cercanos primero, cursor (distancia, id)
+      o solo (id) si el usuario no tiene ubicación.
+    """
+
+    page_size = 20
+    max_page_size = 50
+
+    def get_ordering(self, queryset, view=None):
+        annotations = queryset.query.annotations
+        if "deck_position" in annotations:
+            return ("deck_position", "id")
+        if "distance_obj" in annotations:
+            return ("distance_obj", "id")
+        return ("id",)
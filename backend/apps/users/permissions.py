@@ -30,4 +30,5 @@ class HasProfile(permissions.BasePermission):
 
     def has_permission(self, request, view) -> Any:
         # Si no está logueado, fallará IsAuthenticated primero, así que aquí asumimos que lo está.
-        return hasattr(request.user, "profile")
+        # El profile_id viene en el token: no hace falta cargar el perfil.
+        return getattr(request.user, "profile_id", None) is not None
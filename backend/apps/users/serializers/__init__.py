@@ -1,6 +1,10 @@
-from .auth_serializer import UserRegistrationSerializer
+from .auth_serializer import (
+    ProfileTokenObtainPairSerializer,
+    UserRegistrationSerializer,
+)
 from .entities_serializer import UserPhotoSerializer, UserPhotoUploadSerializer
 from .profiles_serializer import (
+    FeedProfileSerializer,
     PrivateProfileSerializer,
     ProfileWriteSerializer,
     PublicProfileSerializer,
@@ -8,7 +12,9 @@ from .profiles_serializer import (
 
 __all__ = [
     "UserRegistrationSerializer",
+    "ProfileTokenObtainPairSerializer",
     "UserPhotoSerializer",
+    "FeedProfileSerializer",
     "PrivateProfileSerializer",
     "ProfileWriteSerializer",
     "PublicProfileSerializer",
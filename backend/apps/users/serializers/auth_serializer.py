@@ -1,9 +1,10 @@
 from django.db import transaction
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from apps.users.models.users import CustomUser
 
+from ..authentication import ProfileRefreshToken
 from ..models import Profile
 
 
@@ -20,13 +21,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def get_refresh(self, instance):
         # Optimizacion: Generamos el token una vez y lo guardamos en la instancia temporalmente
         if not hasattr(instance, "_cached_token"):
-            instance._cached_token = RefreshToken.for_user(instance)
+            instance._cached_token = ProfileRefreshToken.for_user(instance)
         return str(instance._cached_token)
 
     def get_access(self, instance):
         # Reutilizamos el token generado en get_refresh (o lo creamos si este se llama primero)
         if not hasattr(instance, "_cached_token"):
-            instance._cached_token = RefreshToken.for_user(instance)
+            instance._cached_token = ProfileRefreshToken.for_user(instance)
         return str(instance._cached_token.access_token)
 
     def validate(self, attrs):
@@ -49,3 +50,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             )
 
         return user
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login JWT: los tokens llevan el claim 'profile_id' (ver ProfileJWTAuthentication)."""
+
+    token_class = ProfileRefreshToken
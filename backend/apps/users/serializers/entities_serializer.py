@@ -1,6 +1,6 @@
-from PIL import Image
 from rest_framework import serializers
 
+from ..imaging import InvalidImageError, read_header
 from ..models import UserPhoto
 
 
@@ -8,12 +8,34 @@ class UserPhotoSerializer(serializers.ModelSerializer):
     """
     Serializador para las fotos.
     Transforma el objeto ImageField en una URL completa.
+
+    'srcset' da las variantes por tamaño para pedir la más pequeña que
+    quepa: {"card": {"width": 480, "height": 640, "webp": url, "jpeg": url}}.
+    Vacío mientras la foto no está procesada (usar 'image').
     """
 
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = UserPhoto
-        fields = ["id", "image", "is_main", "caption"]
-        read_only_fields = ["id"]
+        fields = ["id", "image", "srcset", "is_main", "caption", "status"]
+        read_only_fields = ["id", "status"]
+
+    def get_srcset(self, obj: UserPhoto) -> dict[str, dict[str, int | str]]:
+        request = self.context.get("request")
+        storage = obj.image.storage
+
+        def to_url(name: str) -> str:
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            name: {
+                key: to_url(value) if isinstance(value, str) else value
+                for key, value in variant.items()
+            }
+            for name, variant in obj.variants.items()
+        }
 
 
 class UserPhotoUploadSerializer(serializers.ModelSerializer):
@@ -25,10 +47,15 @@ class UserPhotoUploadSerializer(serializers.ModelSerializer):
     MAX_SIZE_MB = 5
     MAX_SIZE_BYTES = MAX_SIZE_MB * 1024 * 1024
 
+    # FileField y no ImageField: el ImageField de DRF abre la imagen y la
+    # recorre entera con verify(); aquí basta con la cabecera (validate_image)
+    image = serializers.FileField()
+
     class Meta:
         model = UserPhoto
-        fields = ["id", "image", "caption", "is_main"]
-        read_only_fields = ["id"]
+        # 'status' sale como "pending": la imagen se procesa tras responder
+        fields = ["id", "image", "caption", "is_main", "status"]
+        read_only_fields = ["id", "status"]
 
     def validate_image(self, value):
         # Validación extra: No dejar subir archivos según el tamaño
@@ -36,11 +63,10 @@ class UserPhotoUploadSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 f"La imagen es demasiado pesada (>{self.MAX_SIZE_MB}MB)"
             )
+        # Solo la cabecera: formato y dimensiones sin decodificar un píxel.
+        # La imagen se decodifica una única vez, al procesarla.
         try:
-            img = Image.open(value)
-            img.verify()
-        except Exception:
-            raise serializers.ValidationError(
-                "El archivo subido no es una imagen válida o está corrupto."
-            ) from None
+            read_header(value)
+        except InvalidImageError as exc:
+            raise serializers.ValidationError(str(exc)) from None
         return value
@@ -2,6 +2,7 @@ from django.contrib.gis.geos import Point
 from rest_framework import serializers
 
 from ..models import Profile
+from ..services.deck_service import invalidate_deck
 from ..validators import validate_adult_age
 from .entities_serializer import UserPhotoSerializer
 
@@ -57,6 +58,20 @@ class PublicProfileSerializer(BaseProfileSerializer):
         return int(obj.distance_obj.km)  # Convertimos a entero (5.4 km -> 5 km)
 
 
+class FeedProfileSerializer(PublicProfileSerializer):
+    """
+    Tarjeta del feed: solo la foto principal (Profile.main_photo, un JOIN)
+    en lugar de todas las fotos. La galería completa sale del detalle.
+    """
+
+    main_photo = UserPhotoSerializer(read_only=True)
+
+    class Meta(PublicProfileSerializer.Meta):
+        fields = [
+            field for field in PublicProfileSerializer.Meta.fields if field != "photos"
+        ] + ["main_photo"]
+
+
 class PrivateProfileSerializer(BaseProfileSerializer):
     """
     AÑADE los datos sensibles.
@@ -113,10 +128,35 @@ class ProfileWriteSerializer(serializers.ModelSerializer):
             "longitude",
         ]
 
+    # Campos que cambian QUIÉN aparece en el feed: si cambian, el mazo caduca.
+    # gender y birth_date cuentan por las preferencias de los candidatos
+    # (apply_reciprocal_filters).
+    DECK_FIELDS = (
+        "max_distance",
+        "min_age",
+        "max_age",
+        "gender_preference",
+        "gender",
+        "birth_date",
+    )
+
     def update(self, instance: Profile, validated_data):
         # Extraer y eliminar del dict para que no rompa el super().update
         lat = validated_data.pop("latitude", None)
         lng = validated_data.pop("longitude", None)
+
+        deck_changed = any(
+            field in validated_data
+            and validated_data[field] != getattr(instance, field)
+            for field in self.DECK_FIELDS
+        )
         if lat is not None and lng is not None:
-            instance.location = Point(float(lng), float(lat))  # (x, y) = (lng, lat)
-        return super().update(instance, validated_data)
+            # (x, y) = (lng, lat)
+            new_location = Point(float(lng), float(lat), srid=4326)
+            deck_changed = deck_changed or instance.location != new_location
+            instance.location = new_location
+
+        instance = super().update(instance, validated_data)
+        if deck_changed:
+            invalidate_deck(instance)
+        return instance
@@ -1,3 +1,26 @@
+from .deck_service import (
+    discard_from_deck,
+    ensure_deck,
+    invalidate_deck,
+    with_deck_order,
+)
+from .photo_service import (
+    ensure_main_photo,
+    process_photo,
+    requeue_unprocessed_photos,
+    schedule_photo_processing,
+)
 from .profile_service import annotate_distance_from_user, apply_matching_filters
 
-__all__ = ["annotate_distance_from_user", "apply_matching_filters"]
+__all__ = [
+    "annotate_distance_from_user",
+    "apply_matching_filters",
+    "discard_from_deck",
+    "ensure_deck",
+    "ensure_main_photo",
+    "invalidate_deck",
+    "process_photo",
+    "requeue_unprocessed_photos",
+    "schedule_photo_processing",
+    "with_deck_order",
+]
@@ -0,0 +1,123 @@
+import logging
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from uuid import UUID
+
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, F, Max, OuterRef, QuerySet
+
+from ..models import DeckEntry, Profile
+from .profile_service import annotate_distance_from_user, apply_matching_filters
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de cada recarga y umbral a partir del cual se recarga en segundo plano
+DECK_REFILL_SIZE = 200
+DECK_LOW_WATERMARK = 50
+
+# Pool pequeño y acotado: las recargas no compiten con las peticiones
+_refill_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deck-refill")
+_pending_refills: set[UUID] = set()
+_pending_lock = threading.Lock()
+
+
+def refill_deck(profile: Profile, limit: int = DECK_REFILL_SIZE) -> int:
+    """
+    Ejecuta la query completa del feed (geo + edad + género + exclusiones)
+    y añade al final del mazo los siguientes `limit` candidatos.
+
+    Returns:
+        Número de candidatos añadidos
+    """
+    in_deck = DeckEntry.objects.filter(owner=profile, candidate=OuterRef("pk"))
+    candidates = apply_matching_filters(
+        annotate_distance_from_user(Profile.objects.all(), profile), profile
+    ).filter(~Exists(in_deck))
+
+    with transaction.atomic():
+        last_position = DeckEntry.objects.filter(owner=profile).aggregate(
+            last=Max("position")
+        )["last"]
+        start = 0 if last_position is None else last_position + 1
+
+        candidate_ids = list(candidates.values_list("id", flat=True)[:limit])
+        DeckEntry.objects.bulk_create(
+            [
+                DeckEntry(owner=profile, candidate_id=candidate_id, position=start + i)
+                for i, candidate_id in enumerate(candidate_ids)
+            ],
+            # Una recarga concurrente puede haber metido ya al mismo candidato
+            ignore_conflicts=True,
+        )
+    return len(candidate_ids)
+
+
+def _refill_in_background(profile_id: UUID) -> None:
+    try:
+        profile = Profile.objects.get(id=profile_id)
+        refill_deck(profile)
+    except Profile.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception("Error recargando el mazo del perfil %s", profile_id)
+    finally:
+        with _pending_lock:
+            _pending_refills.discard(profile_id)
+        # Cada hilo del pool tiene su propia conexión: la cerramos al terminar
+        close_old_connections()
+
+
+def _submit_refill(profile_id: UUID) -> None:
+    with _pending_lock:
+        if profile_id in _pending_refills:
+            return
+        _pending_refills.add(profile_id)
+    _refill_executor.submit(_refill_in_background, profile_id)
+
+
+def schedule_deck_refill(profile: Profile) -> None:
+    """
+    Encola una recarga en segundo plano (como mucho una pendiente por perfil).
+    Se lanza tras el commit para que el hilo vea los cambios de esta transacción.
+    """
+    transaction.on_commit(partial(_submit_refill, profile.id))
+
+
+def ensure_deck(profile: Profile) -> None:
+    """
+    Garantiza que el mazo tenga cartas antes de servir el feed.
+    - Vacío (primera vez o invalidado): se construye en la petición.
+    - Por debajo del umbral: se recarga en segundo plano.
+    """
+    # COUNT acotado por LIMIT: nunca recorre más de DECK_LOW_WATERMARK filas
+    remaining = DeckEntry.objects.filter(owner=profile)[:DECK_LOW_WATERMARK].count()
+    if remaining == 0:
+        refill_deck(profile)
+    elif remaining < DECK_LOW_WATERMARK:
+        schedule_deck_refill(profile)
+
+
+def with_deck_order(queryset: QuerySet[Profile], profile: Profile) -> QuerySet[Profile]:
+    """
+    Restringe el queryset a los candidatos del mazo y anota 'deck_position'
+    para paginar por el índice (owner, position).
+    """
+    return queryset.filter(in_decks__owner=profile).annotate(
+        deck_position=F("in_decks__position")
+    )
+
+
+def discard_from_deck(owner_id: UUID, candidate_ids: Iterable[UUID]) -> None:
+    """Saca candidatos del mazo (un DELETE por clave primaria, sin reconstruir)."""
+    DeckEntry.objects.filter(owner_id=owner_id, candidate_id__in=candidate_ids).delete()
+
+
+def invalidate_deck(profile: Profile) -> None:
+    """
+    Vacía el mazo cuando cambian las preferencias de búsqueda y lo
+    reconstruye en segundo plano.
+    """
+    DeckEntry.objects.filter(owner=profile).delete()
+    schedule_deck_refill(profile)
@@ -0,0 +1,378 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from uuid import UUID
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Value, When
+from PIL import Image, UnidentifiedImageError
+
+from ..imaging import IMAGE_SETTINGS, RenderedVariants, render_variants
+from ..models import PhotoBlob, Profile, UserPhoto
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # True: se procesa en el propio hilo tras el commit (tests, desarrollo)
+    "INLINE": False,
+    # Procesos que decodifican/codifican imágenes a la vez
+    "MAX_WORKERS": 2,
+    # Intentos antes de marcar la foto como fallida
+    "MAX_ATTEMPTS": 3,
+    # Espera antes de reintentar (se multiplica por el nº de intento)
+    "RETRY_DELAY": 2.0,
+}
+
+# Errores al decodificar la propia imagen: reintentar no sirve de nada.
+# (InvalidImageError es un ValueError.) Un OSError suelto puede ser del
+# storage o del disco, así que ese se reintenta.
+PERMANENT_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, ValueError)
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "PHOTO_PROCESSING", {})}
+
+
+# Un hilo por proceso del pool: lee el original, espera al proceso y guarda.
+# El CPU (decodificar, LANCZOS, optimize=True) va al pool y nunca bloquea
+# un worker de peticiones ni una transacción abierta.
+_job_executor = ThreadPoolExecutor(
+    max_workers=_config()["MAX_WORKERS"], thread_name_prefix="photo-jobs"
+)
+_process_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor | None:
+    """Pool de procesos (perezoso), o None si la plataforma no lo soporta."""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            try:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=_config()["MAX_WORKERS"],
+                    # Sin fork: el servidor tiene hilos y conexiones abiertas
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            except (NotImplementedError, OSError, ValueError):
+                logger.warning("Sin pool de procesos: las fotos se procesan en hilo")
+                return None
+        return _process_pool
+
+
+def _discard_process_pool() -> None:
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def _render(data: bytes) -> RenderedVariants:
+    if _config()["INLINE"]:
+        return render_variants(data)
+    pool = _get_process_pool()
+    if pool is None:
+        return render_variants(data)
+    try:
+        return pool.submit(render_variants, data).result()
+    except BrokenProcessPool:
+        # Un proceso murió (p. ej. OOM): el siguiente intento crea otro pool
+        _discard_process_pool()
+        raise
+
+
+def content_digest(chunks: Iterable[bytes]) -> str:
+    """SHA-256 del contenido: la clave del PhotoBlob."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _variant_paths(variants: dict) -> list[str]:
+    return [
+        variant[output.name]
+        for variant in variants.values()
+        for output in IMAGE_SETTINGS.formats
+        if variant.get(output.name)
+    ]
+
+
+def delete_files(storage, names: Iterable[str]) -> None:
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("No se pudo borrar %s", name, exc_info=True)
+
+
+def _acquire_blob(digest: str) -> PhotoBlob | None:
+    """
+    Suma una referencia al blob y lo devuelve, o None si no existe.
+    El UPDATE va antes que la lectura: si release_blob lo está borrando,
+    espera al bloqueo de la fila y no lo encuentra.
+    """
+    if not PhotoBlob.objects.filter(pk=digest).update(refcount=F("refcount") + 1):
+        return None
+    return PhotoBlob.objects.get(pk=digest)
+
+
+def release_blob(digest: str) -> None:
+    """Resta una referencia; con la última se borran la fila y sus archivos."""
+    with transaction.atomic():
+        PhotoBlob.objects.filter(pk=digest).update(refcount=F("refcount") - 1)
+        blob = PhotoBlob.objects.filter(pk=digest, refcount=0).first()
+        if blob is None:
+            return
+        names = {blob.image, *_variant_paths(blob.variants)}
+        blob.delete()
+    storage = UserPhoto._meta.get_field("image").storage
+    transaction.on_commit(partial(delete_files, storage, names))
+
+
+def release_photo_files(photo: UserPhoto) -> None:
+    """
+    Suelta los archivos de una foto borrada o reemplazada: una referencia
+    menos a su blob, o sus propios archivos si no tenía (original sin
+    procesar o foto anterior a los blobs). Se borran tras el commit.
+    """
+    if photo.blob_id:
+        release_blob(photo.blob_id)
+        return
+    names = {photo.image.name, *_variant_paths(photo.variants)} - {""}
+    if names:
+        transaction.on_commit(partial(delete_files, photo.image.storage, names))
+
+
+# Candidatas a principal: primero las ya procesadas, luego la más reciente
+FALLBACK_MAIN_ORDER = (
+    Case(When(status=UserPhoto.Status.READY, then=Value(0)), default=Value(1)),
+    "-created",
+)
+
+
+def ensure_main_photo(profile_id: UUID, exclude: UUID | None = None) -> UUID | None:
+    """
+    Si el perfil se ha quedado sin foto principal (se borró, se desmarcó o
+    nunca marcó una), promueve otra de sus fotos (salvo `exclude` y las
+    fallidas) para que el feed no lo enseñe sin foto.
+    Devuelve la foto principal resultante, o None si no tiene ninguna.
+    """
+    with transaction.atomic():
+        # Bloquea el perfil, igual que UserPhoto.save al cambiar de principal
+        profile = (
+            Profile.objects.select_for_update()
+            .filter(pk=profile_id)
+            .only("main_photo")
+            .first()
+        )
+        if profile is None:
+            return None
+        if profile.main_photo_id is not None:
+            return profile.main_photo_id
+
+        fallback = (
+            UserPhoto.objects.filter(profile_id=profile_id)
+            .exclude(status=UserPhoto.Status.FAILED)
+            .exclude(pk=exclude)
+            .order_by(*FALLBACK_MAIN_ORDER)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if fallback is not None:
+            UserPhoto.objects.filter(pk=fallback).update(is_main=True)
+            Profile.objects.filter(pk=profile_id).update(main_photo=fallback)
+        return fallback
+
+
+def _link_blob(photo: UserPhoto, blob: PhotoBlob) -> bool:
+    """
+    Apunta la foto al blob ya referenciado. Devuelve False (y suelta la
+    referencia) si la foto se borró mientras tanto.
+    """
+    # update() en vez de save(): ni reprocesa ni vuelve a calcular el hash
+    # Solo si sigue siendo el mismo original (pudo reemplazarse entretanto)
+    updated = UserPhoto.objects.filter(
+        pk=photo.pk, blob=None, image=photo.image.name
+    ).update(
+        blob=blob,
+        image=blob.image,
+        variants=blob.variants,
+        status=UserPhoto.Status.READY,
+    )
+    if not updated:
+        release_blob(blob.pk)
+        return False
+    # El original sin procesar ya no hace falta
+    delete_files(photo.image.storage, [photo.image.name])
+    return True
+
+
+def attach_existing_blob(photo: UserPhoto) -> bool:
+    """
+    Si el contenido subido ya existe, la foto usa ese blob (con su
+    referencia sumada) y queda lista: no se sube ni se procesa nada.
+    Se llama dentro de la transacción de UserPhoto.save.
+    """
+    blob = _acquire_blob(content_digest(photo.image.chunks()))
+    if blob is None:
+        return False
+    photo.blob = blob
+    photo.image = blob.image
+    photo.variants = blob.variants
+    photo.status = UserPhoto.Status.READY
+    return True
+
+
+def _create_blob(digest: str, rendered: RenderedVariants) -> PhotoBlob | None:
+    """
+    Guarda las variantes bajo el hash ("photos/ab/<hash>_card.webp") y
+    crea el blob con una referencia. Si otro job ha creado el mismo blob
+    a la vez, se usa el suyo y se borran los archivos propios.
+    """
+    storage = UserPhoto._meta.get_field("image").storage
+    base = f"photos/{digest[:2]}/{digest}"
+
+    variants: dict[str, dict[str, int | str]] = {}
+    for name, variant in rendered.items():
+        stored: dict[str, int | str] = {
+            "width": variant["width"],
+            "height": variant["height"],
+        }
+        for output in IMAGE_SETTINGS.formats:
+            stored[output.name] = storage.save(
+                f"{base}_{name}{output.extension}", ContentFile(variant[output.name])
+            )
+        variants[name] = stored
+
+    primary = variants[IMAGE_SETTINGS.primary_variant]
+    blob, created = PhotoBlob.objects.get_or_create(
+        digest=digest,
+        defaults={
+            "image": primary[IMAGE_SETTINGS.primary_format.name],
+            "variants": variants,
+            "refcount": 1,
+        },
+    )
+    if created:
+        return blob
+    delete_files(storage, _variant_paths(variants))
+    return _acquire_blob(digest)
+
+
+def process_photo(photo_id: UUID) -> UserPhoto.Status | None:
+    """
+    Procesa una foto pendiente (un intento).
+
+    La reclama con un UPDATE condicional (pending -> processing), así dos
+    ejecuciones concurrentes nunca procesan la misma foto. Si su contenido
+    ya tiene blob (p. ej. dos subidas iguales a la vez) solo se enlaza.
+    Devuelve el estado final, o None si no había nada que hacer.
+    """
+    claimed = UserPhoto.objects.filter(
+        pk=photo_id, status=UserPhoto.Status.PENDING
+    ).update(status=UserPhoto.Status.PROCESSING, attempts=F("attempts") + 1)
+    if not claimed:
+        return None
+
+    photo = UserPhoto.objects.filter(pk=photo_id).first()
+    if photo is None:
+        return None
+
+    try:
+        with photo.image.open("rb") as raw:
+            data = raw.read()
+        digest = content_digest([data])
+        blob = _acquire_blob(digest)
+        if blob is None:
+            rendered = _render(data)
+            blob = _create_blob(digest, rendered)
+    except PERMANENT_ERRORS:
+        logger.warning("La foto %s no se puede procesar", photo_id, exc_info=True)
+        return _mark(photo_id, UserPhoto.Status.FAILED)
+    except Exception:
+        logger.exception("Error procesando la foto %s", photo_id)
+        if photo.attempts >= _config()["MAX_ATTEMPTS"]:
+            return _mark(photo_id, UserPhoto.Status.FAILED)
+        return _mark(photo_id, UserPhoto.Status.PENDING)
+
+    if blob is None:
+        # El blob se borró justo entre crearlo otro job y enlazarlo: otra vuelta
+        return _mark(photo_id, UserPhoto.Status.PENDING)
+    if not _link_blob(photo, blob):
+        return None
+    return UserPhoto.Status.READY
+
+
+def _mark(photo_id: UUID, status: UserPhoto.Status) -> UserPhoto.Status:
+    UserPhoto.objects.filter(pk=photo_id).update(status=status)
+    return status
+
+
+def _run_job(photo_id: UUID) -> None:
+    try:
+        status = process_photo(photo_id)
+        if status == UserPhoto.Status.PENDING:
+            _schedule_retry(photo_id)
+    except Exception:
+        logger.exception("Error en el job de la foto %s", photo_id)
+    finally:
+        # Cada hilo del pool tiene su propia conexión: la cerramos al terminar
+        close_old_connections()
+
+
+def _schedule_retry(photo_id: UUID) -> None:
+    attempts = (
+        UserPhoto.objects.filter(pk=photo_id).values_list("attempts", flat=True).first()
+    )
+    if attempts is None:
+        return
+    timer = threading.Timer(
+        _config()["RETRY_DELAY"] * attempts, _submit_photo_job, args=(photo_id,)
+    )
+    timer.daemon = True
+    timer.start()
+
+
+def _submit_photo_job(photo_id: UUID) -> None:
+    if _config()["INLINE"]:
+        # Sin pool ni hilos: los reintentos van seguidos
+        for _ in range(_config()["MAX_ATTEMPTS"]):
+            if process_photo(photo_id) != UserPhoto.Status.PENDING:
+                break
+        return
+    _job_executor.submit(_run_job, photo_id)
+
+
+def schedule_photo_processing(photo_id: UUID) -> None:
+    """
+    Encola el procesado de una foto recién subida.
+    Se lanza tras el commit para que el job vea la fila y el original.
+    """
+    transaction.on_commit(partial(_submit_photo_job, photo_id))
+
+
+def requeue_unprocessed_photos() -> int:
+    """
+    Reencola las fotos sin procesar (p. ej. tras un reinicio a mitad de un
+    job). Las que se quedaron en "processing" vuelven a "pending".
+    """
+    UserPhoto.objects.filter(status=UserPhoto.Status.PROCESSING).update(
+        status=UserPhoto.Status.PENDING
+    )
+    photo_ids = list(
+        UserPhoto.objects.filter(status=UserPhoto.Status.PENDING)
+        .order_by("created")
+        .values_list("pk", flat=True)
+    )
+    for photo_id in photo_ids:
+        _submit_photo_job(photo_id)
+    return len(photo_ids)
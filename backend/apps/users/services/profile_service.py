@@ -1,11 +1,51 @@
 from typing import cast
 
-from django.contrib.gis.db.models.functions import Distance as DistanceFunc
-from django.db.models import QuerySet
-
-from apps.matches.models import Swipe
+from django.contrib.gis.db.models import PointField
+from django.contrib.gis.db.models.sql import DistanceField
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    Func,
+    OuterRef,
+    Q,
+    QuerySet,
+    Value,
+)
+
+from apps.matches.models import Block, Swipe
 
 from ..models import Profile, ProfileQuerySet
+from ..models.profiles import as_geography
+
+
+class DWithin(Func):
+    """
+    ST_DWithin(a, b, metros) sobre geography.
+    Es un predicado "indexable": PostGIS lo resuelve con el índice GiST
+    sin calcular la distancia exacta de cada fila de la tabla.
+    """
+
+    function = "ST_DWithin"
+    output_field = BooleanField()
+
+
+class KNNDistance(Func):
+    """
+    Operador <-> de PostGIS (distancia esférica en metros para geography).
+    Usado en el ORDER BY permite un recorrido KNN del índice GiST:
+    los vecinos salen ya ordenados y no hay que ordenar toda la tabla.
+    """
+
+    arg_joiner = " <-> "
+    template = "(%(expressions)s)"
+
+
+def _viewer_location(user_profile: Profile):
+    """Ubicación del usuario como parámetro geography (mismo cast que el índice)."""
+    return as_geography(
+        Value(user_profile.location, output_field=PointField(srid=4326))
+    )
 
 
 def apply_matching_filters(
@@ -18,32 +58,23 @@ def apply_matching_filters(
     Args:
         queryset: QuerySet base de perfiles
         user_profile: Perfil del usuario que está filtrando
-        exclude_user_id: ID del usuario a excluir (usualmente el propio)
 
     Returns:
         QuerySet filtrado según preferencias
     """
-    # 1. Recolectar IDs para excluir (Bloqueados + Usuario actual)
-
-    # Usamos "blocks_given" (coincide con related_name en Block).
-    # Añadimos # type: ignore para que Pylance no se queje de atributos dinámicos.
-    # Obtenemos "blocked_id" (el ID del perfil bloqueado)
-    excluded_ids = list(
-        user_profile.blocks_given.values_list("blocked_id", flat=True)  # type: ignore
-    )
-
-    # Excluimos usuarios a los que ya les hemos dado like
-    liked_users = list(
-        Swipe.objects.filter(swiper=user_profile).values_list("target_id", flat=True)
+    # 1. Excluirse a sí mismo (filtrar por PK es lo más barato)
+    queryset = queryset.exclude(id=user_profile.id)
+
+    # 2. Excluir bloqueados (en ambos sentidos) y perfiles ya votados.
+    # Usamos NOT EXISTS correlacionados en vez de traer listas de IDs a Python:
+    # cada uno es un anti-join resuelto con el índice único de la pareja
+    # (swiper, target) / (blocker, blocked), y el feed queda en una sola query
+    # sin importar cuántos swipes tenga el usuario.
+    queryset = queryset.filter(
+        ~Exists(Swipe.objects.filter(swiper=user_profile, target=OuterRef("pk"))),
+        ~Exists(Block.objects.filter(blocker=user_profile, blocked=OuterRef("pk"))),
+        ~Exists(Block.objects.filter(blocker=OuterRef("pk"), blocked=user_profile)),
     )
-    excluded_ids.extend(liked_users)
-    # Añadimos el perfil del usuario actual a la lista de exclusión.
-    # Es más eficiente filtrar por ID (Primary Key) que por foreign key (custom_user_id).
-    excluded_ids.append(user_profile.id)
-
-    # 2. Excluir usuarios bloqueados y a sí mismo
-    if excluded_ids:
-        queryset = queryset.exclude(id__in=excluded_ids)
 
     # 3. Filtro de género
     if user_profile.gender_preference and user_profile.gender_preference != "A":
@@ -54,10 +85,54 @@ def apply_matching_filters(
         user_profile.min_age, user_profile.max_age
     )
 
-    # 5. Filtro de distancia
+    # 5. Filtro de distancia (radio sobre geography, resuelto con el índice GiST)
     if user_profile.location and user_profile.max_distance:
         max_meters = user_profile.max_distance * 1000
-        queryset = queryset.filter(distance_obj__lte=max_meters)
+        queryset = queryset.filter(
+            DWithin(
+                as_geography("location"),
+                _viewer_location(user_profile),
+                max_meters,
+            )
+        )
+
+    # 6. Preferencias DEL CANDIDATO (matching en los dos sentidos).
+    # No tiene sentido enseñar a alguien que nunca nos vería a nosotros.
+    return apply_reciprocal_filters(queryset, user_profile)
+
+
+def apply_reciprocal_filters(
+    queryset: QuerySet[Profile], user_profile: Profile
+) -> QuerySet[Profile]:
+    """
+    Filtra los candidatos cuyas preferencias excluyen al usuario.
+
+    La edad del usuario se calcula una vez en Python, así en SQL solo quedan
+    comparaciones de columnas contra constantes (indexables), sin AGE().
+    """
+    viewer_age = user_profile.age
+
+    # El candidato busca "Todos" o justo el género del usuario
+    queryset = queryset.filter(
+        Q(gender_preference=Profile.GenderPreference.ALL)
+        | Q(gender_preference=user_profile.gender),
+        min_age__lte=viewer_age,
+        max_age__gte=viewer_age,
+    )
+
+    # El usuario tiene que estar dentro del radio del candidato.
+    # Este radio varía por fila, así que se evalúa después del radio indexado.
+    # location IS NOT NULL no cambia el resultado (ST_DWithin ya lo exige),
+    # pero permite al planner usar el índice parcial profile_located_prefs_idx.
+    if user_profile.location:
+        queryset = queryset.filter(
+            DWithin(
+                as_geography("location"),
+                _viewer_location(user_profile),
+                F("max_distance") * 1000,
+            ),
+            location__isnull=False,
+        )
 
     return queryset
 
@@ -78,6 +153,12 @@ def annotate_distance_from_user(
     if not user_profile.location:
         return queryset
 
+    # Anotamos con <-> (y no con ST_Distance) para que el ORDER BY sea un
+    # recorrido KNN del índice en vez de calcular y ordenar todas las filas.
     return queryset.annotate(
-        distance_obj=DistanceFunc("location", user_profile.location)
-    ).order_by("distance_obj")
+        distance_obj=KNNDistance(
+            as_geography("location"),
+            _viewer_location(user_profile),
+            output_field=DistanceField(Profile._meta.get_field("location")),
+        )
+    ).order_by("distance_obj", "id")
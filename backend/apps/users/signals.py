@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import UserPhoto
+from .services.photo_service import ensure_main_photo, release_photo_files
+
+
+@receiver(post_delete, sender=UserPhoto)
+def release_files_on_photo_delete(sender, instance: UserPhoto, **kwargs):
+    """
+    UserPhoto está excluida de django_cleanup (sus archivos pueden ser
+    compartidos): aquí se suelta su blob o se borran sus propios archivos.
+    Los archivos se borran tras el commit, como hace django_cleanup.
+    """
+    release_photo_files(instance)
+    if instance.is_main:
+        # El perfil no se queda sin foto en el feed si le quedan otras
+        ensure_main_photo(instance.profile_id)
@@ -1 +1,185 @@
-# Create your tests here.
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from PIL import UnidentifiedImageError
+
+from .models import CustomUser, Profile, UserPhoto
+from .services import annotate_distance_from_user, apply_matching_filters
+from .services.deck_service import DECK_REFILL_SIZE
+from .services.photo_service import process_photo
+
+
+def make_profiles(count, prefix, **fields):
+    users = CustomUser.objects.bulk_create(
+        CustomUser(email=f"{prefix}{i}@example.com") for i in range(count)
+    )
+    return Profile.objects.bulk_create(
+        Profile(
+            custom_user=user,
+            first_name=prefix,
+            birth_date=date(1995, 6, 15),
+            **fields,
+        )
+        for user in users
+    )
+
+
+def explain(queryset, *disabled: str) -> str:
+    """
+    EXPLAIN con estadísticas reales y desactivando los planes indicados
+    ("seqscan", "sort"...): si aun así no queda otro plan, Postgres lo usa
+    igualmente, así que un plan sin ellos demuestra que no hacen falta.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE users_profile")
+        for plan_type in disabled:
+            # Solo durante la transacción del test
+            cursor.execute(f"SET LOCAL enable_{plan_type} = off")
+    return queryset.explain()
+
+
+class MatchingIndexPlanTests(TestCase):
+    """
+    El feed (apply_matching_filters) tiene que resolverse con los índices
+    de preferencias de la migración 0006 y no recorriendo toda la tabla.
+
+    Hay muchos perfiles descartados por las preferencias y pocos válidos:
+    con estadísticas reales el índice de preferencias es el más selectivo.
+    """
+
+    near = Point(-3.70, 40.41, srid=4326)
+
+    def explain(self, viewer):
+        return explain(apply_matching_filters(Profile.objects.all(), viewer), "seqscan")
+
+    def test_gender_filtered_feed_uses_prefs_index(self):
+        # Busca mujeres que busquen hombres o "Todos"; sin ubicación no hay radio
+        viewer = make_profiles(1, "viewer", gender="M", gender_preference="F")[0]
+        make_profiles(300, "other", gender="M", gender_preference="F")
+        make_profiles(5, "match", gender="F", gender_preference="A")
+
+        plan = self.explain(viewer)
+
+        self.assertIn("profile_match_prefs_idx", plan)
+        self.assertNotIn("Seq Scan on users_profile", plan)
+
+    def test_located_feed_for_all_uses_partial_prefs_index(self):
+        # Busca "Todos": sin filtro por género, entra el índice parcial
+        viewer = make_profiles(
+            1, "viewer", gender="M", gender_preference="A", location=self.near
+        )[0]
+        make_profiles(
+            300, "other", gender="F", gender_preference="F", location=self.near
+        )
+        make_profiles(5, "match", gender="F", gender_preference="M", location=self.near)
+
+        plan = self.explain(viewer)
+
+        self.assertIn("profile_located_prefs_idx", plan)
+        self.assertNotIn("Seq Scan on users_profile", plan)
+
+
+class FeedRadiusPlanTests(TestCase):
+    """
+    La latencia del feed no depende del tamaño de la tabla si el radio
+    (ST_DWithin) y el orden por distancia (<->) salen del índice GiST: ni
+    se calcula la distancia de cada fila ni se ordena la tabla entera.
+    """
+
+    def test_radius_and_distance_order_use_gist_index(self):
+        madrid = Point(-3.70, 40.41, srid=4326)
+        viewer = make_profiles(
+            1, "viewer", gender="F", gender_preference="A", location=madrid
+        )[0]
+        # Pasan todos los filtros de preferencias; solo el radio los separa
+        make_profiles(300, "far", gender="M", location=Point(2.17, 41.39, srid=4326))
+        make_profiles(5, "near", gender="M", location=Point(-3.69, 40.42, srid=4326))
+
+        # La query con la que se rellena el mazo
+        queryset = annotate_distance_from_user(
+            apply_matching_filters(Profile.objects.all(), viewer), viewer
+        )[:DECK_REFILL_SIZE]
+        plan = explain(queryset, "seqscan", "sort")
+
+        self.assertIn("profile_location_geog_gist", plan)
+        # Recorrido KNN: el índice entrega las filas ya ordenadas por distancia
+        self.assertIn("Order By:", plan)
+        # Como mucho un Incremental Sort para el desempate por id
+        self.assertNotRegex(plan, r"(?m)^(\s*->)?\s*Sort  \(")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PhotoProcessingErrorTests(TestCase):
+    """Solo los errores de decodificación marcan la foto como fallida."""
+
+    def setUp(self):
+        profile = make_profiles(1, "photo", gender="F")[0]
+        self.photo = UserPhoto.objects.create(
+            profile=profile, image=ContentFile(b"raw", name="upload.jpg")
+        )
+
+    def process(self, error):
+        with mock.patch("apps.users.services.photo_service._render", side_effect=error):
+            return process_photo(self.photo.id)
+
+    def test_undecodable_image_fails_at_once(self):
+        status = self.process(UnidentifiedImageError("cannot identify image file"))
+
+        self.assertEqual(status, UserPhoto.Status.FAILED)
+
+    def test_storage_error_is_retried(self):
+        status = self.process(OSError("No space left on device"))
+
+        self.assertEqual(status, UserPhoto.Status.PENDING)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MainPhotoFallbackTests(TestCase):
+    """Un perfil con fotos no se queda sin principal (ni sin foto en el feed)."""
+
+    def setUp(self):
+        self.profile = make_profiles(1, "main", gender="F")[0]
+
+    def add_photo(self, status=UserPhoto.Status.READY, **fields):
+        photo = UserPhoto.objects.create(
+            profile=self.profile,
+            image=ContentFile(b"raw", name="upload.jpg"),
+            **fields,
+        )
+        UserPhoto.objects.filter(pk=photo.pk).update(status=status)
+        return photo
+
+    def main_photo_id(self):
+        self.profile.refresh_from_db()
+        return self.profile.main_photo_id
+
+    def test_first_photo_becomes_main(self):
+        photo = self.add_photo()
+
+        self.assertTrue(photo.is_main)
+        self.assertEqual(self.main_photo_id(), photo.pk)
+
+    def test_deleting_main_promotes_newest_ready_photo(self):
+        main = self.add_photo(is_main=True)
+        ready = self.add_photo()
+        self.add_photo(status=UserPhoto.Status.PENDING)
+
+        main.delete()
+
+        self.assertEqual(self.main_photo_id(), ready.pk)
+        self.assertTrue(UserPhoto.objects.get(pk=ready.pk).is_main)
+
+    def test_unmarked_main_is_not_promoted_again(self):
+        main = self.add_photo(is_main=True)
+        other = self.add_photo()
+
+        main.is_main = False
+        main.save()
+
+        self.assertEqual(self.main_photo_id(), other.pk)
+        self.assertFalse(UserPhoto.objects.get(pk=main.pk).is_main)
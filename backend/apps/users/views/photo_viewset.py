@@ -19,7 +19,8 @@ class UserPhotoViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self) -> Any:
         # Solo mis fotos
-        return UserPhoto.objects.filter(profile__custom_user=self.request.user)
+        user: Any = self.request.user
+        return UserPhoto.objects.filter(profile_id=user.profile_id)
 
     def get_serializer_class(self) -> Any:
         if self.action == "create":
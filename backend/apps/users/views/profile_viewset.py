@@ -8,13 +8,15 @@ from rest_framework.permissions import IsAuthenticated
 
 from ..filters import ProfileFilter
 from ..models import Profile
+from ..pagination import FeedCursorPagination
 from ..permissions import IsOwnerOrReadOnly
 from ..serializers import (
+    FeedProfileSerializer,
     PrivateProfileSerializer,
     ProfileWriteSerializer,
     PublicProfileSerializer,
 )
-from ..services import annotate_distance_from_user, apply_matching_filters
+from ..services import annotate_distance_from_user, ensure_deck, with_deck_order
 
 
 # --- VIEWSET DE PERFILES (ModelViewSet) ---
@@ -30,6 +32,9 @@ class ProfileViewSet(
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProfileFilter
+    # El feed se pagina por cursor (posición en el mazo, id): páginas de tamaño
+    # fijo y sin OFFSET, así las páginas profundas cuestan lo mismo que la primera.
+    pagination_class = FeedCursorPagination
 
     # --- OPTIMIZACIÓN DE BD ---
     @override
@@ -44,7 +49,13 @@ class ProfileViewSet(
         """
         # 1. PREPARACIÓN DE LA QUERY
         # - optimizaciones: Carga tablas relacionadas para no hacer 100 queries.
-        qs = Profile.objects.select_related("custom_user").prefetch_related("photos")
+        # - feed: solo la foto principal, en el mismo JOIN (sin prefetch de fotos)
+        if self.action == "list":
+            qs = Profile.objects.select_related("custom_user", "main_photo")
+        else:
+            qs = Profile.objects.select_related("custom_user").prefetch_related(
+                "photos"
+            )
 
         # Obtenemos el perfil del usuario logueado (nuestras "Settings")
         user: Any = self.request.user
@@ -53,14 +64,19 @@ class ProfileViewSet(
         # 2. LÓGICA GEOESPACIAL (Distancia)
         qs = annotate_distance_from_user(qs, user_profile)
 
-        # 3. FILTRADO ESTRICTO (Solo en el listado / Feed)
+        # 3. FEED: Solo los candidatos del mazo precalculado.
+        # Los filtros de matching ya se aplicaron al construir el mazo.
         if self.action == "list":
-            qs = apply_matching_filters(
-                queryset=qs,
-                user_profile=user_profile,
-            )
+            qs = with_deck_order(qs, user_profile)
         return qs
 
+    @override
+    def list(self, request, *args, **kwargs):
+        # Construye el mazo si está vacío o lo recarga en segundo plano si queda poco
+        user: Any = request.user
+        ensure_deck(user.profile)
+        return super().list(request, *args, **kwargs)
+
     # --- SERIALIZADOR DINÁMICO ---
 
     @override
@@ -76,7 +92,11 @@ class ProfileViewSet(
                 return ProfileWriteSerializer
             return PrivateProfileSerializer
 
-        # 3. Lectura general (Listar/Ver otros) -> Serializador público seguro
+        # 3. Feed -> Tarjeta con la foto principal
+        if self.action == "list":
+            return FeedProfileSerializer
+
+        # 4. Lectura general (Ver otros) -> Serializador público seguro
         return PublicProfileSerializer
 
     @override
@@ -101,7 +121,7 @@ class ProfileViewSet(
                 obj = (
                     Profile.objects.select_related("custom_user")
                     .prefetch_related("photos")
-                    .get(custom_user=user)
+                    .get(id=user.profile_id)
                 )
                 # Validación manual de permisos a nivel de objeto
                 # Esto ejecuta has_object_permission() de todos los permission_classes
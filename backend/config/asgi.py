@@ -12,6 +12,7 @@ import os
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 
+from apps.chat.lifespan import LifespanApp, install_daphne_shutdown_hook
 from apps.chat.middleware import JWTAuthMiddleware
 from apps.chat.routing import websocket_urlpatterns
 
@@ -28,5 +29,10 @@ application = ProtocolTypeRouter(
         "websocket": JWTAuthMiddleware(  # Autentica con JWT desde query param ?token=xxx
             URLRouter(websocket_urlpatterns)
         ),
+        # 3. Arranque/apagado del servidor (vacía el buffer de mensajes)
+        "lifespan": LifespanApp(),
     }
 )
+
+# Daphne no usa "lifespan": el buffer se vacía al parar su reactor
+install_daphne_shutdown_hook()
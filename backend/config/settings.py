@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.gis",
+    "django.contrib.postgres",
     "django_filters",
     "rest_framework",
     "rest_framework_simplejwt.token_blacklist",
@@ -157,7 +158,8 @@ STATIC_URL = "static/"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT sin estado: no carga CustomUser, el token trae el profile_id
+        "apps.users.authentication.ProfileJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     # Generador de documentación
@@ -173,6 +175,7 @@ SIMPLE_JWT = {
     "ALGORITHM": "HS256",
     "SIGNING_KEY": os.environ.get("JWT_SIGNING_KEY", SECRET_KEY),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "apps.users.serializers.ProfileTokenObtainPairSerializer",
 }
 
 # Configuración de Channels y Redis
@@ -186,6 +189,60 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Escritura agrupada de mensajes del chat ("group commit").
+# Desactivada por defecto: cada mensaje va en su propia transacción.
+CHAT_MESSAGE_WRITER = {
+    "ENABLED": os.environ.get("CHAT_MESSAGE_WRITER", "0") == "1",
+    "MAX_BATCH": 100,  # Filas máximas por INSERT
+    "MAX_DELAY_MS": 5,  # Espera máxima para juntar mensajes
+    "MAX_PENDING": 1000,  # Tamaño máximo del buffer (backpressure)
+}
+
+# Presencia y "escribiendo" del chat (claves con TTL en Redis, nunca en Postgres).
+# En tests: "apps.chat.services.presence.InMemoryPresenceBackend".
+CHAT_PRESENCE = {
+    "BACKEND": os.environ.get(
+        "CHAT_PRESENCE_BACKEND", "apps.chat.services.presence.RedisPresenceBackend"
+    ),
+    "TTL": 60,  # Segundos de "online" sin renovar
+    "OFFLINE_GRACE": 5,  # Debounce de la transición a offline
+    "TYPING_THROTTLE": 2,  # Un "escribiendo" por conexión cada N segundos
+    "BROADCAST_INTERVAL": 0.5,  # Un broadcast por sala como mucho en este intervalo
+}
+
+# Cola de salida por conexión WebSocket (backpressure ante clientes lentos)
+CHAT_OUTBOUND = {
+    "MAX_QUEUE": 256,  # Frames pendientes por conexión; por encima, se cierra
+    "MAX_BATCH": 20,  # Frames por envío agrupado {"type": "batch"}
+    "STATS_INTERVAL": 60,  # Segundos entre logs de outbound_stats() (0 = nunca)
+}
+
+# Caché de usuarios autenticados por WebSocket (por proceso, hasta el exp del token)
+CHAT_TOKEN_CACHE = {
+    "MAX_SIZE": 10_000,  # Entradas como máximo (LRU)
+    "STATS_INTERVAL": 60,  # Segundos entre logs de aciertos/fallos (0 = nunca)
+}
+
+# Django solo configura sus propios loggers: las métricas del chat van a consola
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "apps.chat.middleware": {"handlers": ["console"], "level": "INFO"},
+        "apps.chat.services.outbound": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
+# Procesado de fotos fuera de la petición (pool de procesos, sin broker).
+# PHOTO_PROCESSING_INLINE=1 lo hace en el mismo proceso tras el commit (tests).
+PHOTO_PROCESSING = {
+    "INLINE": os.environ.get("PHOTO_PROCESSING_INLINE", "0") == "1",
+    "MAX_WORKERS": int(os.environ.get("PHOTO_PROCESSING_WORKERS", "2")),
+    "MAX_ATTEMPTS": 3,  # Intentos antes de marcar la foto como fallida
+    "RETRY_DELAY": 2.0,  # Segundos (x nº de intento) antes de reintentar
+}
+
 
 #  Solo permitimos a nuestro frontend
 CORS_ALLOWED_ORIGINS = [
@@ -5,7 +5,9 @@ export interface PublicProfile {
   work: string | null;
   age: string;
   gender: IGender;
-  photos: IPhoto[];
+  // Detalle: todas las fotos. Feed: solo main_photo (más ligero)
+  photos?: IPhoto[];
+  main_photo?: IPhoto | null;
   distance_km: string;
 }
 
@@ -43,11 +45,22 @@ export interface IEditProfile {
   longitude?: number | null;
 }
 
+export interface PhotoVariant {
+  width: number;
+  height: number;
+  webp: string;
+  jpeg: string;
+}
+
 export interface IPhoto {
   id: string;
   image: string;
+  // Variantes por tamaño ('thumb' | 'card' | 'full'); vacío hasta que se procesa
+  srcset: Partial<Record<'thumb' | 'card' | 'full', PhotoVariant>>;
   is_main: boolean;
   caption: string | null;
+  // 'pending' | 'processing': se muestra el original hasta que termine el procesado
+  status: 'pending' | 'processing' | 'ready' | 'failed';
 }
 
 export interface PhotoUpload {
@@ -55,3 +68,9 @@ export interface PhotoUpload {
   is_main: boolean;
   caption: string | null;
 }
+
+// Respuesta paginada por cursor del backend
+export interface Paginated<T> {
+  next: string | null;
+  results: T[];
+}
@@ -3,28 +3,44 @@ import { webSocket, WebSocketSubject } from 'rxjs/webSocket';
 import { environment } from '../../../environments/environment';
 import { HttpClient } from '@angular/common/http';
 import { lastValueFrom, retry } from 'rxjs';
+import { Paginated } from '../models/user';
 
 export interface ChatMessage {
+  id?: string;
   text: string;
   is_me: boolean;
   created_at: string;
 }
+// Página del historial: 'newer' es la URL con los mensajes posteriores al último recibido
+export interface MessagePage extends Paginated<ChatMessage> {
+  newer: string | null;
+}
 // 2. Payloads de RED (Internos del servicio)
 interface WSSendPayload {
   message: string;
 }
 interface WSReceivePayload {
+  id: string;
   message: string;
   sender_id: string;
   timestamp: string;
 }
+// Eventos con 'type' (receipt, presence...) que el chat no pinta
+interface WSEventPayload {
+  type: string;
+}
+interface WSBatchPayload {
+  type: 'batch';
+  frames: WSFrame[];
+}
+type WSFrame = WSReceivePayload | WSEventPayload;
 @Injectable({
   providedIn: 'root',
 })
 export class ChatService {
   private http = inject(HttpClient);
   // La variable guarda la conexión activa, puede ser null al principio
-  private socket$: WebSocketSubject<WSSendPayload | WSReceivePayload> | null = null;
+  private socket$: WebSocketSubject<WSSendPayload | WSFrame | WSBatchPayload> | null = null;
   messages = signal<ChatMessage[]>([]);
 
   async connect(matchId: string, currentUserId: string) {
@@ -37,21 +53,37 @@ export class ChatService {
     await this.getHistory(matchId);
 
     const token = localStorage.getItem('access_token');
-    const url = `${environment.wsUrl}/${matchId}/?token=${token}`;
+    // 'since': el servidor nos reenvía lo que llegó entre el historial y la conexión
+    const lastId = this.messages().at(-1)?.id;
+    const since = lastId ? `&since=${lastId}` : '';
+    const url = `${environment.wsUrl}/${matchId}/?token=${token}${since}`;
     // 3. Crear la conexión
     this.socket$ = webSocket(url);
 
     // 4. Escuchar (IMPORTANTE: Sin subscribe no conecta)
     this.socket$.subscribe((data) => {
-      const payload = data as WSReceivePayload;
-      const uiMessage: ChatMessage = {
-        text: payload.message,
-        is_me: payload.sender_id === currentUserId,
-        created_at: payload.timestamp,
-      };
-      this.messages.update((prev) => [...prev, uiMessage]);
+      // El servidor agrupa varios eventos en un solo frame si vamos lentos
+      if ('frames' in data) {
+        data.frames.forEach((frame) => this.handleFrame(frame, currentUserId));
+        return;
+      }
+      this.handleFrame(data, currentUserId);
     });
   }
+  private handleFrame(data: WSFrame, currentUserId: string) {
+    // Los receipts de lectura ({type: 'receipt'}), presencia, etc. no son mensajes
+    if ('type' in data) return;
+    const payload = data as WSReceivePayload;
+    // Un mensaje reenviado por 'since' puede llegar también en vivo
+    if (payload.id && this.messages().some((m) => m.id === payload.id)) return;
+    const uiMessage: ChatMessage = {
+      id: payload.id,
+      text: payload.message,
+      is_me: payload.sender_id === currentUserId,
+      created_at: payload.timestamp,
+    };
+    this.messages.update((prev) => [...prev, uiMessage]);
+  }
   sendMessage(text: string) {
     const payload: WSSendPayload = { message: text };
     this.socket$?.next(payload);
@@ -60,10 +92,11 @@ export class ChatService {
     try {
       const history = await lastValueFrom(
         this.http
-          .get<ChatMessage[]>(`${environment.apiUrl}/chat/messages/?match_id=${matchId}`)
+          .get<MessagePage>(`${environment.apiUrl}/chat/messages/?match_id=${matchId}`)
           .pipe(retry({ count: 3, delay: 2000 })),
       );
-      this.messages.set(history.reverse());
+      // La API devuelve la página más reciente, del más nuevo al más antiguo
+      this.messages.set(history.results.reverse());
     } catch (e) {
       console.log('Error cargando historial', e);
     }
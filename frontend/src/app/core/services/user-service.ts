@@ -1,6 +1,13 @@
 import { inject, Injectable, effect } from '@angular/core';
 import { signal, computed } from '@angular/core';
-import { ICurrentProfile, IEditProfile, IPhoto, PhotoUpload, PublicProfile } from '../models/user';
+import {
+  ICurrentProfile,
+  IEditProfile,
+  IPhoto,
+  Paginated,
+  PhotoUpload,
+  PublicProfile,
+} from '../models/user';
 import { environment } from '../../../environments/environment';
 import { HttpClient } from '@angular/common/http';
 import { tap } from 'rxjs';
@@ -43,8 +50,16 @@ export class UserService {
   // Métodos públicos para refrescar datos
   refreshUsers() {
     this.httpClient
-      .get<PublicProfile[]>(environment.apiUrl + '/users/profiles/')
-      .subscribe({ next: (data) => this.users.set(data), error: (err) => console.log(err) });
+      .get<Paginated<PublicProfile>>(environment.apiUrl + '/users/profiles/')
+      .subscribe({
+        next: (data) => this.users.set(data.results),
+        error: (err) => console.log(err),
+      });
+  }
+
+  // Perfil completo (con todas las fotos); el feed solo trae la principal
+  getProfile(id: string) {
+    return this.httpClient.get<PublicProfile>(environment.apiUrl + `/users/profiles/${id}/`);
   }
 
   refreshCurrentUser() {
@@ -1,5 +1,6 @@
-import { Component, input, output } from '@angular/core';
-import { PublicProfile } from '@core/models/user';
+import { Component, inject, input, OnInit, output, signal } from '@angular/core';
+import { IPhoto, PublicProfile } from '@core/models/user';
+import { UserService } from '@core/services/user-service';
 
 @Component({
   selector: 'app-user-detail-modal',
@@ -7,13 +8,30 @@ import { PublicProfile } from '@core/models/user';
   templateUrl: './user-detail-modal.html',
   styleUrl: './user-detail-modal.scss',
 })
-export class UserDetailModal {
+export class UserDetailModal implements OnInit {
+  private readonly userService = inject(UserService);
+
   user = input.required<PublicProfile>();
 
   closeModal = output<void>();
   swipe = output<'LIKE' | 'DISLIKE'>();
 
   protected currentPhotoIndex = 0;
+  protected readonly photos = signal<IPhoto[]>([]);
+
+  ngOnInit() {
+    const user = this.user();
+    const mainPhoto = user.main_photo;
+    this.photos.set(user.photos ?? (mainPhoto ? [mainPhoto] : []));
+
+    // Desde el feed solo llega la foto principal: se carga la galería completa
+    if (!user.photos) {
+      this.userService.getProfile(user.id).subscribe({
+        next: (profile) => this.photos.set(profile.photos ?? []),
+        error: (err) => console.log(err),
+      });
+    }
+  }
 
   onClose() {
     this.closeModal.emit();
@@ -25,7 +43,7 @@ export class UserDetailModal {
   }
 
   nextPhoto() {
-    const photos = this.user().photos;
+    const photos = this.photos();
     if (this.currentPhotoIndex < photos.length - 1) {
       this.currentPhotoIndex++;
     }